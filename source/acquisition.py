@@ -0,0 +1,260 @@
+"""The test loop that reads the pumps, free of any tkinter.
+
+- Acquisition opens the pumps and output file, takes readings and closes them
+- acquire_in_process runs an Acquisition in a multiprocessing worker
+"""
+
+from multiprocessing import shared_memory
+import os  # removing unused output files
+import time  # sleeping
+from typing import Optional
+from serial import SerialException
+
+from datawriter import DataWriter
+from metrics import ReadingMetrics, metrics_path
+from poller import PumpPoller
+from pump import CODES, Conditions, Pump, parse_pressure, pipeline
+from ringbuffer import RingBuffer
+from scheduler import ReadingScheduler
+
+HEADER_ROW = ["Timestamp", "Seconds", "Minutes", "Pump 1", "Pump 2"]
+
+
+class Acquisition():
+    """Reads a pair of pumps on a schedule until the test is over.
+
+    Everything it needs comes in a plain settings dict, readings go to a
+    RingBuffer and the output file, and messages go to a log callable, so
+    it runs the same in a RigManager thread or in a worker process.
+    connect returns a Pump for a port, or something that acts like one,
+    eg. PortBroker.connect.
+    """
+
+    def __init__(self, settings: dict, buffer: RingBuffer, log, is_running,
+                 connect=None):
+        """Init with the test settings, where to put readings and how to report."""
+        self.settings = settings
+        if connect is None:
+            def connect(port):
+                return Pump(port, **settings['pump'])
+        self.connect = connect
+        self.buffer = buffer
+        self.log = log
+        self.is_running = is_running  # returns False when told to stop
+        self.interval = settings['interval']
+        self.elapsed = 0.0
+        self.readings = 0
+        self.pump1: Optional[Pump] = None  # or whatever connect returns
+        self.pump2: Optional[Pump] = None
+        self.poller: Optional[PumpPoller] = None
+        self.writer: Optional[DataWriter] = None
+        self.metrics = ReadingMetrics()
+        self.scheduler = ReadingScheduler(
+            self.interval, catch_up=settings['catch up']
+        )
+
+    def open(self) -> bool:
+        """Create the output file and connect to the pumps."""
+        # the file stays open for the whole test, see DataWriter
+        self.writer = DataWriter(
+            self.settings['outpath'],
+            HEADER_ROW,
+            flush_rows=self.settings['flush rows'],
+            flush_seconds=self.settings['flush seconds'],
+            fsync=self.settings['fsync']
+        )
+        try:
+            self.pump1 = self.connect(self.settings['port1'])
+            self.pump2 = self.connect(self.settings['port2'])
+        except SerialException:
+            self.log("Could not establish a connection to the pumps",
+                     "Try resetting the port connections")
+            for pump in (self.pump1, self.pump2):
+                if pump is not None:
+                    pump.close()
+            self.writer.close()
+            return False
+        # give each pump its own reader thread so both answer at once
+        if self.settings['concurrent']:
+            # long enough for a pump to use up all its retries
+            budget = self.pump1.budget * (self.pump1.retries + 1)
+            self.poller = PumpPoller((self.pump1, self.pump2), timeout=budget + 0.5)
+        return True
+
+    def discard(self) -> None:
+        """Close the ports and file of a test that never ran, and delete the file."""
+        if self.poller is not None:
+            self.poller.close()
+        for pump in (self.pump1, self.pump2):
+            if pump is not None:
+                pump.close()
+        if self.writer is not None:
+            try:
+                self.writer.close()
+                # it only has the header in it
+                os.remove(self.settings['outpath'])
+            except OSError as error:
+                print(f"Couldn't remove the unused output file {self.settings['outpath']}")
+                print(error)
+
+    def run(self) -> None:
+        """Take readings until a pump fails, time runs out or we're stopped."""
+        if self.writer is None or self.pump1 is None or self.pump2 is None:
+            raise RuntimeError("The pumps and output file have to be opened first")
+        for pump in (self.pump1, self.pump2):
+            try:
+                pump.run()
+            except SerialException as error:
+                self.log(error)
+        # let the pumps warm up before we start recording data
+        time.sleep(3)
+
+        psi1, psi2 = 0, 0
+        failpsi = self.settings['failpsi']
+        self.readings = 0
+        # readings are taken at 0, 1, ..., max_slots intervals
+        max_slots = round(self.settings['time limit'] * 60 / self.interval)
+        self.scheduler.begin()
+        while (
+                (psi1 < failpsi or psi2 < failpsi)
+                and self.scheduler.slot < max_slots
+        ):
+            slot = self.scheduler.wait()
+            if not self.is_running():
+                break
+            self.elapsed = self.scheduler.elapsed()
+            self.readings += 1
+            if self.scheduler.jitter > self.interval / 2:
+                print(f"reading {self.scheduler.slot} was "
+                      f"{round(self.scheduler.jitter, 3)} s late")
+            rtt1: Optional[float] = None  # stay None if the poll failed
+            rtt2: Optional[float] = None
+            skew: Optional[float] = None
+            polled = time.monotonic()
+            try:
+                if self.poller is not None:
+                    cond1, cond2 = self.poller.query(
+                        lambda pump: pump.conditions()
+                    )
+                else:
+                    # both pumps are asked before either answer is read
+                    cond1, cond2 = (Conditions(*reply) for reply in pipeline(
+                        (self.pump1, self.pump2), CODES['info'], parse_pressure
+                    ))
+                psi1, psi2 = cond1.pressure, cond2.pressure
+                # how far apart in time the two pressures were taken
+                skew = abs(cond2.arrived - cond1.arrived)
+                rtt1 = cond1.arrived - cond1.sent
+                rtt2 = cond2.arrived - cond2.sent
+            except SerialException as error:
+                # a pump ran out of retries, keep the last pressures
+                self.log(error)
+            written = time.monotonic()
+            this_data = [
+                time.strftime("%I:%M:%S", time.localtime()),
+                round(self.elapsed, 1),  # as seconds
+                f"{self.elapsed/60:.2f}",  # as minutes
+                psi1,
+                psi2
+            ]
+            try:
+                self.writer.writerow(this_data)
+            except Exception as error:
+                self.log(error)
+            posted = time.monotonic()
+            self.buffer.append(self.elapsed / 60, psi1, psi2)
+            this_reading = (
+                f"{self.elapsed/60:.2f} min, {psi1} psi, {psi2} psi"
+            )
+            self.log(this_reading)
+            done = time.monotonic()
+            self.metrics.record(
+                slot, slot * self.interval, self.elapsed, rtt1, rtt2, skew,
+                written - polled, posted - written, done - posted
+            )
+            # end of while loop
+        print("Test complete")
+
+    def close(self) -> None:
+        """Stop the pumps, close the ports and file, then report how it went."""
+        print("Ending the test")
+        if self.poller is not None:
+            self.poller.close()
+        for pump in (self.pump1, self.pump2):
+            if pump is None:
+                continue
+            try:
+                pump.stop()
+            except SerialException as error:
+                print("Failed to send stop order to pump")
+                print(error)
+            pump.close()
+            self.log(pump.timing_summary())
+
+        try:
+            if self.writer is not None:
+                self.writer.close()
+        except OSError as error:
+            self.log("Failed to save the end of the output file", error)
+
+        try:
+            # every slot handed out was due, whether or not it was read
+            max_measures = self.scheduler.slot + 1
+            completion_rate = round(self.readings / max_measures * 100, 1)
+            if completion_rate >= 100:
+                completion_rate = 100
+            this_duration = f"{self.elapsed/60:.2f} min"
+            self.log(
+                f"Took {self.readings}/{max_measures} expected readings in {this_duration}"
+            )
+            self.log(f"Dataset is {completion_rate}% complete")
+            self.log(self.scheduler.summary())
+        except ZeroDivisionError:
+            self.log("The test ended before any measurements were recorded")
+        self.report_metrics()
+
+    def report_metrics(self) -> None:
+        """Log the reading timings and save them next to the output file."""
+        if not self.metrics:
+            return
+        self.log(*self.metrics.summary())
+        self.log("Reading jitter histogram:", *self.metrics.histogram())
+        path = metrics_path(self.settings['outpath'])
+        try:
+            self.metrics.save(path)
+            self.log(f"Saved the reading timings to \n{path}")
+        except OSError as error:
+            self.log("Failed to save the reading timings", error)
+
+
+def acquire_in_process(settings: dict, shm_name: str, conn) -> None:
+    """Run an Acquisition in a worker process.
+
+    Readings go into the RingBuffer in the shared memory block shm_name.
+    Log messages are sent up conn as ('log', msgs), then ('done', None)
+    once the pumps and file are closed. Sending 'stop' down conn ends the
+    test early.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    buffer = RingBuffer(settings['capacity'], HEADER_ROW[2:], shm.buf)
+    stopped = False
+
+    def log(*msgs):
+        conn.send(('log', [f"{msg}" for msg in msgs]))
+
+    def is_running():
+        nonlocal stopped
+        while not stopped and conn.poll():
+            stopped = conn.recv() == 'stop'
+        return not stopped
+
+    acquisition = Acquisition(settings, buffer, log, is_running)
+    try:
+        if acquisition.open():
+            acquisition.run()
+            acquisition.close()
+    finally:
+        buffer.release()
+        shm.close()
+        conn.send(('done', None))
+        conn.close()
@@ -0,0 +1,218 @@
+"""Evaluates projects and writes their reports without the GUI.
+
+Each project needs to have been saved from the Reporter, to the project
+database or as a legacy .pct file in its folder, which is imported. The plot
+is drawn offscreen, then the plot image, calculations log and xlsx report
+are written to the folder just as the Reporter and ReportExporter would.
+Projects are evaluated in parallel, one per worker process.
+
+    python batch.py "C:/projects/Customer/Company - Well 1" ...
+    python batch.py --manifest overnight.csv --time-limit 120
+
+A manifest is a csv file with a 'project' column of folders. It can also
+have columns for the report header: analysis, customer, sample point,
+production company, submitted by, date submitted, temperature, chlorides,
+bicarbonates, and clarities, with one clarity per trial split by ';'.
+Anything left out is filled in the same way as the ReportExporter form.
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from configparser import ConfigParser
+import csv
+import os  # handling file paths
+import sys
+
+from matplotlib import cycler, rc_context, style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from defaults import DEFAULT_DICT
+from datacache import CACHE
+from evaluator import evaluate
+from reportwriter import default_details, split_project, write_report
+from plotter import color_cycle, plot_project, style_axes
+from projectdb import ProjectDB
+
+# manifest columns for the report header, in the ReportExporter form's order
+DETAIL_FIELDS = ['analysis', 'customer', 'sample point', 'production company',
+                 'submitted by', 'date submitted', 'temperature', 'chlorides',
+                 'bicarbonates']
+
+
+def project_file(folder: str) -> str:
+    """Return the path of the .pct file the Reporter used to save in folder."""
+    return os.path.join(folder, f"{split_project(folder)[-1]}.pct")
+
+
+def locate(path: str, folder: str) -> str:
+    """Return path, or the file of the same name in folder if path is gone.
+
+    Lets a project that was moved or copied from another PC find its data.
+    """
+    if os.path.isfile(path):
+        return path
+    moved = os.path.join(folder, split_project(path)[-1])
+    if os.path.isfile(moved):
+        return moved
+    return path
+
+
+def read_manifest(path: str) -> list:
+    """Return a job for each row of a manifest file."""
+    jobs = []
+    with open(path, newline='') as file:
+        for row in csv.DictReader(file):
+            row = {key.strip().lower(): (value or '').strip()
+                   for key, value in row.items() if key}
+            if not row.get('project'):
+                continue
+            job = {'folder': row['project'], 'details': None, 'clarities': None}
+            if any(row.get(field) for field in DETAIL_FIELDS):
+                details = default_details(row['project'])
+                for index, field in enumerate(DETAIL_FIELDS):
+                    if row.get(field):
+                        details[index] = row[field]
+                job['details'] = details
+            if row.get('clarities'):
+                job['clarities'] = [i.strip() for i in row['clarities'].split(';')]
+            jobs.append(job)
+    return jobs
+
+
+def run_project(job: dict, options: dict) -> dict:
+    """Evaluate one project and write its files, returning how it went.
+
+    Runs in a worker process, so everything comes and goes as plain data.
+    """
+    folder = job['folder']
+    CACHE.configure(options['cache bytes'], options['cache sidecars'])
+    outcome = {'folder': folder, 'results': [], 'report': None, 'error': None}
+    try:
+        projects = ProjectDB(options['database'])
+        plot = projects.load_project(folder)
+        if plot is None:
+            plot = projects.import_pct(project_file(folder), folder)
+        plot_style, xlim, ylim, baseline = plot['plot_params'][:4]
+        # scoring parameters given on the command line win over the project's
+        xlim = options['time limit'] or xlim
+        ylim = options['fail psi'] or ylim
+        if options['baseline'] is not None:
+            baseline = options['baseline']
+        paths = [locate(path, folder) if path else path for path in plot['paths']]
+
+        colors = color_cycle(options['colors'])
+        try:
+            cycle = cycler(color=colors)
+        except ValueError:
+            print(f"{folder}: invalid color cycle, reverting to defaults")
+            cycle = cycler(color=color_cycle(
+                DEFAULT_DICT['report settings']['color cycle']
+            ))
+        with style.context(plot_style), rc_context({'axes.prop_cycle': cycle}):
+            fig = Figure(figsize=(12.5, 5), dpi=100)
+            FigureCanvasAgg(fig)
+            ax = fig.add_subplot(111)
+            style_axes(ax, xlim, ylim)
+            fig.tight_layout()
+            blanks, trials = plot_project(
+                ax, paths, plot['titles'], plot['plotpumps'], options['method']
+            )
+            if len(blanks) == 0:
+                raise ValueError("At least one series title must contain 'blank'")
+            if len(trials) == 0:
+                raise ValueError("Must select least one trial not titled 'blank'")
+            evaluation = evaluate(
+                folder, blanks, trials, baseline, xlim, ylim, options['interval']
+            )
+            name = split_project(folder)[-1]
+            fig.savefig(os.path.join(folder, f"{name}.png"))
+
+        with open(os.path.join(folder, f"{name} log.txt"), 'w') as file:
+            file.write('\n'.join(evaluation.log()))
+        outcome['results'] = list(zip(evaluation.result_titles, evaluation.result_values))
+        for path in paths:
+            if path and os.path.isfile(path):
+                projects.index_run(path)
+        projects.record_scores(dict(plot, paths=paths), evaluation)
+
+        if options['template']:
+            details = job['details'] or default_details(folder)
+            clarities = job['clarities'] or ["Clear"] * len(evaluation.trials)
+            outcome['report'] = write_report(
+                options['template'], folder, evaluation, details, clarities
+            )
+            if outcome['report'] is None:
+                raise FileNotFoundError("Couldn't find the plot image file")
+    except Exception as error:  # one bad project shouldn't stop the batch
+        outcome['error'] = f"{type(error).__name__}: {error}"
+    return outcome
+
+
+def main(argv=None) -> int:
+    """Evaluate the projects named on the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('projects', nargs='*', help="project folders")
+    parser.add_argument('--manifest', help="csv file listing project folders")
+    parser.add_argument('--config', default='assets/scalewiz.ini',
+                        help="settings file to read")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="how many projects to work on at once")
+    parser.add_argument('--time-limit', type=int, help="minutes, overrides the projects'")
+    parser.add_argument('--fail-psi', type=int, help="psi, overrides the projects'")
+    parser.add_argument('--baseline', type=int, help="psi, overrides the projects'")
+    parser.add_argument('--interval', type=int, help="seconds per reading, overrides the settings'")
+    parser.add_argument('--template', help="report template, overrides the settings'")
+    parser.add_argument('--no-report', action='store_true',
+                        help="only evaluate, don't write the xlsx reports")
+    args = parser.parse_args(argv)
+
+    config = ConfigParser()
+    config.read_dict(DEFAULT_DICT)
+    config.read(args.config)
+
+    jobs = [{'folder': folder, 'details': None, 'clarities': None}
+            for folder in args.projects]
+    if args.manifest:
+        jobs += read_manifest(args.manifest)
+    if not jobs:
+        parser.error("no projects given")
+
+    template = args.template or config.get('report settings', 'template path')
+    if args.no_report:
+        template = ''
+    elif not os.path.isfile(template):
+        parser.error(f"no report template at '{template}', use --template or --no-report")
+    options = {
+        'interval': args.interval or config.getint('test settings', 'interval seconds'),
+        'time limit': args.time_limit,
+        'fail psi': args.fail_psi,
+        'baseline': args.baseline,
+        'colors': config.get('report settings', 'color cycle'),
+        'method': config.get('test settings', 'downsample method', fallback='minmax'),
+        'template': os.path.abspath(template) if template else '',
+        'cache bytes': config.getint('report settings', 'data cache mb') * 1024 ** 2,
+        'cache sidecars': config.getboolean('report settings', 'data cache sidecars'),
+        'database': os.path.abspath(config.get('report settings', 'project database')),
+    }
+    ProjectDB(options['database'])  # made once here, not by every worker at once
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        outcomes = pool.map(run_project, jobs, [options] * len(jobs))
+        for outcome in outcomes:
+            print(outcome['folder'])
+            if outcome['error']:
+                failed += 1
+                print(f"  failed: {outcome['error']}")
+                continue
+            for title, value in outcome['results']:
+                print(f"  {title}: {value}")
+            if outcome['report']:
+                print(f"  report: {outcome['report']}")
+    print(f"Evaluated {len(jobs) - failed}/{len(jobs)} projects")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
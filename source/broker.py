@@ -0,0 +1,181 @@
+"""Shares each pump's serial port between the test loops and the console."""
+
+from concurrent.futures import Future
+import itertools
+import queue
+import threading
+
+from serial import SerialException
+
+from pump import Pump
+
+# lower numbers are served first
+ACQUISITION = 0
+CONSOLE = 1
+_CLOSE = 9
+
+
+class PortBusy(SerialException):
+    """Raised for requests to a port that's been lent to another process."""
+
+
+class PortBroker():
+    """Owns one Pump per port for the life of the app.
+
+    Each port gets a thread working through a priority queue of requests,
+    so the test loops and the Pump Controller can both talk to a pump
+    without opening and closing its port, and readings go ahead of
+    anything the console asked for.
+    """
+
+    def __init__(self, budget: float = 0.5, retries: int = 2):
+        """Init with the reply budget and retries for every Pump."""
+        self.budget = budget
+        self.retries = retries
+        self.pumps = {}  # port to Pump, for the ports that are open
+        self.queues = {}  # port to the queue its thread works through
+        self.lent = set()  # ports another process has open, see lend
+        self.counter = itertools.count()  # keeps equal priorities in order
+        self.lock = threading.Lock()
+
+    def submit(self, port: str, func, priority: int = CONSOLE) -> Future:
+        """Queue func(pump) for the pump on port and return its Future."""
+        future = Future()
+        with self.lock:
+            if port in self.lent:
+                future.set_exception(PortBusy(f"{port} is in use by a running test"))
+                return future
+            if port not in self.queues:
+                self.queues[port] = queue.PriorityQueue()
+                threading.Thread(
+                    target=self.serve,
+                    args=(port, self.queues[port]),
+                    name=f"broker {port}",
+                    daemon=True
+                ).start()
+            self.queues[port].put((priority, next(self.counter), func, future))
+        return future
+
+    def call(self, port: str, func, priority: int = CONSOLE):
+        """Run func(pump) for the pump on port and wait for the result."""
+        return self.submit(port, func, priority).result()
+
+    def serve(self, port: str, requests: queue.PriorityQueue) -> None:
+        """Answer requests for one port until it is released."""
+        while True:
+            priority, _, func, future = requests.get()
+            if priority == _CLOSE:
+                if port in self.pumps:
+                    self.pumps.pop(port).close()
+                future.set_result(None)
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if port not in self.pumps:
+                    self.pumps[port] = Pump(port, self.budget, self.retries)
+                future.set_result(func(self.pumps[port]))
+            except Exception as error:
+                # whatever went wrong, the caller hears about it and the
+                # port keeps being served
+                future.set_exception(error)
+
+    def release(self, *ports) -> None:
+        """Close the ports so something else can open them, and wait."""
+        futures = []
+        with self.lock:
+            for port in ports:
+                if port in self.queues:
+                    requests = self.queues.pop(port)
+                    future = Future()
+                    requests.put((_CLOSE, next(self.counter), None, future))
+                    futures.append(future)
+        for future in futures:
+            future.result()
+
+    def lend(self, *ports) -> None:
+        """Close the ports for another process, and refuse requests until reclaimed."""
+        self.release(*ports)
+        with self.lock:
+            self.lent.update(ports)
+
+    def reclaim(self, *ports) -> None:
+        """Take back ports lent to another process."""
+        with self.lock:
+            self.lent.difference_update(ports)
+
+    def connect(self, port: str):
+        """Return a BrokeredPump for port, raising SerialException if it won't open."""
+        pump = BrokeredPump(self, port)
+        pump.open()
+        return pump
+
+    def ports(self) -> set:
+        """Return the set of ports the broker has open."""
+        return set(self.pumps)
+
+    def shutdown(self) -> None:
+        """Close every port."""
+        self.release(*list(self.queues))
+
+
+class BrokeredPump():
+    """Stands in for a Pump, sending everything through a PortBroker."""
+
+    def __init__(self, broker: PortBroker, port: str, priority: int = ACQUISITION):
+        """Init with the broker and the port of the pump."""
+        self.broker = broker
+        self.port = port
+        self.priority = priority
+
+    def open(self) -> None:
+        """Make sure the port can be opened, raising SerialException if not.
+
+        The broker's Pump outlives the test, so its timings start afresh.
+        """
+        self.broker.call(self.port, lambda pump: pump.reset_timings(), self.priority)
+
+    @property
+    def budget(self) -> float:
+        """The pump's reply budget in seconds."""
+        return self.broker.budget
+
+    @property
+    def retries(self) -> int:
+        """How many times a command is retried."""
+        return self.broker.retries
+
+    def command(self, code: str, parse=None) -> tuple:
+        """See Pump.command."""
+        return self.broker.call(
+            self.port, lambda pump: pump.command(code, parse), self.priority
+        )
+
+    def request(self, code: str, parse=None):
+        """See Pump.request."""
+        return self.broker.submit(
+            self.port, lambda pump: pump.command(code, parse), self.priority
+        ).result
+
+    def conditions(self):
+        """See Pump.conditions."""
+        return self.broker.call(
+            self.port, lambda pump: pump.conditions(), self.priority
+        )
+
+    def run(self) -> None:
+        """Start the pump."""
+        self.broker.call(self.port, lambda pump: pump.run(), self.priority)
+
+    def stop(self) -> None:
+        """Stop the pump."""
+        self.broker.call(self.port, lambda pump: pump.stop(), self.priority)
+
+    def close(self) -> None:
+        """Leave the port open for the broker's other users."""
+
+    def timing_summary(self) -> str:
+        """See Pump.timing_summary."""
+        return self.broker.call(
+            self.port, lambda pump: pump.timing_summary(), self.priority
+        )
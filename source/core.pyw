@@ -1,17 +1,34 @@
 """This is the entry point for the program.
 
 - imports then creates an instance of MainWindow
-- has a thread_pool_executor attribute for a blocking loop made in MainWindow
+- has a rig_manager attribute that runs the blocking test loop of each Rig
+- has a ui_queue attribute the test loops use to update widgets
+- has a broker attribute that keeps the pumps' ports open
+- has a projects attribute, the ProjectDB of saved projects and runs
+- has a watcher attribute that keeps the projects and data cache up to date
+
+Run with --import-times to list the slowest imports instead of starting.
 """
 
+# first, so the other imports are timed too
+from startup import StartupTimer, print_import_times
 from configparser import ConfigParser
 import os
-from concurrent.futures import ThreadPoolExecutor  # handling the test
+import sys
 import tkinter as tk  # GUI
 from tkinter import font  # type: ignore
 import settings
 from mainwindow import MainWindow
+from rigmanager import RigManager
+from uiqueue import UIQueue
+from broker import PortBroker
+from projectdb import ProjectDB
+from watcher import FolderWatcher
 from iconer import set_window_icon
+from logsink import make_file_log
+
+TIMER = StartupTimer()
+TIMER.mark('imports')
 
 
 class ScaleWiz(tk.Frame):
@@ -29,11 +46,41 @@ class ScaleWiz(tk.Frame):
             settings.make_config(self.parser)
         self.parser.path = os.path.abspath('assets/scalewiz.ini')
         self.parser.read(self.parser.path)
+        # the rigs' log consoles only keep recent lines, the file keeps all
+        make_file_log(
+            os.path.abspath('assets/scalewiz.log'),
+            max_bytes=self.parser.getint('test settings', 'log file kb', fallback=1024) * 1024
+        )
+        # the only way the test loops may update widgets
+        self.ui_queue = UIQueue(self.root)
+        # owns the pumps' ports so tests and the Pump Controller can share them
+        self.broker = PortBroker(
+            budget=self.parser.getfloat('test settings', 'pump reply budget seconds', fallback=0.5),
+            retries=self.parser.getint('test settings', 'pump retries', fallback=2)
+        )
+        self.projects = ProjectDB(os.path.abspath(self.parser.get(
+            'report settings', 'project database', fallback='assets/projects.db'
+        )))
+        # started by the MainWindow once it knows the project folder
+        self.watcher = FolderWatcher(
+            self.projects,
+            interval=self.parser.getfloat('report settings', 'watch seconds', fallback=10),
+            folder=self.parser.get('report settings', 'watch folder', fallback=''),
+            cache_bytes=self.parser.getint('report settings', 'data cache mb', fallback=64) * 1024 ** 2,
+            sidecars=self.parser.getboolean('report settings', 'data cache sidecars', fallback=False)
+        )
+        self.rig_manager = RigManager(
+            max_rigs=self.parser.getint('test settings', 'max rigs', fallback=8)
+        )
+        TIMER.mark('settings')
         self.mainwin = MainWindow(self)
-        self.thread_pool_executor = ThreadPoolExecutor(max_workers=2)
 
 
 if __name__ == "__main__":
+    if '--import-times' in sys.argv:
+        # start a copy that quits once it's up, and see what it imported
+        print_import_times(os.path.abspath(__file__), args=['--quit-when-ready'])
+        sys.exit()
     root = tk.Tk()
     set_window_icon(root)
     default_font = font.nametofont("TkDefaultFont")
@@ -42,5 +89,11 @@ if __name__ == "__main__":
     root.tk_setPalette(background='#F0F0F0')
     root.title("Scale Block Wizard")
     root.resizable(0, 0)
-    ScaleWiz(root).pack(side="top", fill="both", expand=True)
+    app = ScaleWiz(root)
+    app.pack(side="top", fill="both", expand=True)
+    TIMER.mark('main window')
+    budget = app.parser.getfloat('test settings', 'startup budget seconds', fallback=3)
+    root.after_idle(TIMER.finish, budget)
+    if '--quit-when-ready' in sys.argv:
+        root.after_idle(app.mainwin.close_app)
     root.mainloop()
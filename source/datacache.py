@@ -0,0 +1,131 @@
+"""Keeps parsed data files in memory so re-evaluating doesn't re-read them."""
+
+from collections import OrderedDict
+import os  # handling file paths
+import threading
+
+import numpy as np
+from pandas import DataFrame
+
+from loader import load
+
+
+def sidecar_path(path: str) -> str:
+    """Return where the binary copy of the data file at path is kept."""
+    root, _ = os.path.splitext(path)
+    return f"{root}.cache.npz"
+
+
+class DataCache():
+    """An LRU cache of the columns of data files that get plotted.
+
+    Entries are keyed by the file's path, size and modification time, so
+    a file that's been changed is read again. The least recently used
+    entries are dropped once the cached frames take up more than
+    max_bytes. With sidecars on, each file read is also saved as a
+    compact .npz next to it, which is much quicker to load than the csv
+    the next time the program runs.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 ** 2, sidecars: bool = False):
+        """Init with the memory cap and whether to keep binary sidecars."""
+        self.max_bytes = max_bytes
+        self.sidecars = sidecars
+        self.frames = OrderedDict()  # key to (DataFrame, its size in bytes)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def configure(self, max_bytes: int, sidecars: bool) -> None:
+        """Change the memory cap and sidecar setting."""
+        with self.lock:
+            self.max_bytes = max_bytes
+            self.sidecars = sidecars
+            self.evict()
+
+    @staticmethod
+    def key(path: str) -> tuple:
+        """Return the cache key for the file at path, raising OSError if it's gone."""
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+    def read(self, path: str) -> DataFrame:
+        """Return the Minutes and pump columns of the data file at path.
+
+        The frame may be shared with other callers, so don't modify it.
+        """
+        key = self.key(path)
+        with self.lock:
+            if key in self.frames:
+                self.frames.move_to_end(key)
+                self.hits += 1
+                return self.frames[key][0]
+            self.misses += 1
+
+        df = None
+        if self.sidecars:
+            df = self.load_sidecar(path, key)
+        if df is None:
+            df = load(path)
+            if self.sidecars:
+                self.save_sidecar(path, key, df)
+
+        nbytes = int(df.memory_usage(index=True).sum())
+        with self.lock:
+            if key not in self.frames:
+                self.frames[key] = (df, nbytes)
+                self.nbytes += nbytes
+                self.evict()
+        return df
+
+    def evict(self) -> None:
+        """Drop the least recently used frames until we're under the cap."""
+        while self.frames and self.nbytes > self.max_bytes:
+            _, (_, nbytes) = self.frames.popitem(last=False)
+            self.nbytes -= nbytes
+
+    def clear(self) -> None:
+        """Forget every cached frame."""
+        with self.lock:
+            self.frames.clear()
+            self.nbytes = 0
+
+    @staticmethod
+    def load_sidecar(path: str, key: tuple):
+        """Return the frame saved next to path, or None if it's missing or stale."""
+        try:
+            with np.load(sidecar_path(path)) as saved:
+                if (int(saved['__size__']), int(saved['__mtime__'])) != key[1:]:
+                    return None
+                columns = [name for name in saved.files if not name.startswith('__')]
+                return DataFrame({name: saved[name] for name in columns})
+        except Exception:  # eg. half written, the csv is read instead
+            return None
+
+    @staticmethod
+    def save_sidecar(path: str, key: tuple, df: DataFrame) -> None:
+        """Save the frame next to path, if we're allowed to write there."""
+        sidecar = sidecar_path(path)
+        # written aside then swapped in, so a crash can't leave half a sidecar
+        temp = f"{sidecar}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp, 'wb') as file:
+                np.savez(
+                    file,
+                    __size__=key[1],
+                    __mtime__=key[2],
+                    **{name: df[name].to_numpy() for name in df.columns}
+                )
+            os.replace(temp, sidecar)
+        except OSError as error:
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+            print(f"Couldn't save a cache of {path}")
+            print(error)
+
+
+# shared by everything in this process that reads data files
+CACHE = DataCache()
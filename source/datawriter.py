@@ -0,0 +1,56 @@
+"""A long-lived csv writer for experiment output."""
+
+import csv
+import os
+import time
+
+
+class DataWriter():
+    """Keeps an experiment's output file open and flushes it on a policy.
+
+    Rows are buffered until flush_rows rows or flush_seconds seconds have
+    gone by since the last flush, whichever comes first. Closing the
+    writer flushes what's left, and optionally fsyncs it to disk.
+    """
+
+    def __init__(self, path: str, header: list, flush_rows: int = 10,
+                 flush_seconds: float = 5.0, fsync: bool = True):
+        """Create the file at path and write the header row to it."""
+        self.path = path
+        self.flush_rows = max(flush_rows, 1)
+        self.flush_seconds = flush_seconds
+        self.fsync = fsync
+        self.pending = 0  # rows written since the last flush
+        self.last_flush = time.monotonic()
+        self.file = open(path, "w", newline='')
+        self.writer = csv.writer(self.file, delimiter=',')
+        self.writer.writerow(header)
+        self.flush()
+
+    @property
+    def closed(self) -> bool:
+        """Whether the underlying file has been closed."""
+        return self.file.closed
+
+    def writerow(self, row: list) -> None:
+        """Buffer a row, flushing if the policy says it's time."""
+        self.writer.writerow(row)
+        self.pending += 1
+        overdue = time.monotonic() - self.last_flush >= self.flush_seconds
+        if self.pending >= self.flush_rows or overdue:
+            self.flush()
+
+    def flush(self, sync: bool = False) -> None:
+        """Push buffered rows to the OS, and to disk if sync is True."""
+        self.file.flush()
+        if sync:
+            os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+    def close(self) -> None:
+        """Flush any buffered rows and close the file."""
+        if self.closed:
+            return
+        self.flush(sync=self.fsync)
+        self.file.close()
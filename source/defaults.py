@@ -0,0 +1,46 @@
+"""The settings a new scalewiz.ini starts with, free of any tkinter."""
+
+from configparser import ConfigParser
+
+DEFAULT_DICT = {
+    'test settings': {
+        'fail psi': '1500',
+        'default baseline': 75,
+        'time limit minutes': '90',
+        'interval seconds': '3',
+        'default pump': 'Pump 2',
+        'project folder': '',
+        'catch up missed readings': 'False',
+        'concurrent polling': 'True',
+        'flush every rows': '10',
+        'flush every seconds': '5',
+        'fsync on end': 'True',
+        'max rigs': '8',
+        'acquisition process': 'False',
+        'pump reply budget seconds': '0.5',
+        'pump retries': '2',
+        'console reply budget seconds': '0.25',
+        'downsample method': 'minmax',
+        'log max lines': '1000',
+        'log file kb': '1024',
+        'extra ports': '',
+        'port probe timeout seconds': '2',
+        'startup budget seconds': '3',
+    },
+    'report settings': {
+        'template path': '',
+        'data cache mb': '64',
+        'data cache sidecars': 'False',
+        'project database': 'assets/projects.db',
+        'watch folder': '',
+        'watch seconds': '10',
+        'color cycle': """orange, blue, red, mediumseagreen, darkgoldenrod, indigo, mediumvioletred, darkcyan, maroon, darkslategrey"""
+    }
+}
+
+
+def make_config(parser: ConfigParser):
+    """Create a default scalewiz.ini in the current working directory."""
+    parser.read_dict(DEFAULT_DICT)  # type: ignore
+    with open('assets/scalewiz.ini', 'w') as configfile:
+        parser.write(configfile)
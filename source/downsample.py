@@ -0,0 +1,67 @@
+"""Reduces long pressure series to about as many points as can be seen."""
+
+import numpy as np
+
+
+def minmax(x, y, buckets: int) -> tuple:
+    """Keep the first and last points plus the min and max of each bucket.
+
+    Every spike survives, including the reading where the pressure
+    crosses the failure threshold, so the plot looks the same while
+    drawing at most 2 * buckets + 2 points.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    count = len(y)
+    if buckets < 1 or count <= 2 * buckets + 2:
+        return x, y
+    size = -(-count // buckets)  # points per bucket, rounded up
+    rows = -(-count // size)
+    pad = rows * size - count
+    highs = np.concatenate((y, np.full(pad, -np.inf))).reshape(rows, size)
+    lows = np.concatenate((y, np.full(pad, np.inf))).reshape(rows, size)
+    starts = np.arange(rows) * size
+    keep = np.unique(np.concatenate((
+        (0, count - 1),
+        starts + highs.argmax(axis=1),
+        starts + lows.argmin(axis=1)
+    )))
+    return x[keep], y[keep]
+
+
+def lttb(x, y, threshold: int) -> tuple:
+    """Keep threshold points by largest-triangle-three-buckets.
+
+    Picks the point in each bucket that makes the largest triangle with
+    the point kept before it and the average of the next bucket, which
+    follows the shape of the curve closely with few points.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    count = len(y)
+    if threshold < 3 or count <= threshold:
+        return x, y
+    every = (count - 2) / (threshold - 2)
+    keep = np.zeros(threshold, dtype=int)
+    kept = 0  # index of the last point kept
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        stop = int((i + 1) * every) + 1
+        next_stop = min(int((i + 2) * every) + 1, count)
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
+        areas = np.abs(
+            (x[kept] - avg_x) * (y[start:stop] - y[kept])
+            - (x[kept] - x[start:stop]) * (avg_y - y[kept])
+        )
+        kept = start + int(areas.argmax())
+        keep[i + 1] = kept
+    keep[-1] = count - 1
+    return x[keep], y[keep]
+
+
+def downsample(x, y, pixels: int, method: str = 'minmax') -> tuple:
+    """Reduce a series to what a plot pixels wide can show."""
+    if method == 'lttb':
+        return lttb(x, y, pixels)
+    return minmax(x, y, pixels // 2)
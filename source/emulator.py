@@ -0,0 +1,284 @@
+"""Emulated pumps on pseudo-terminals, for trying the app without hardware.
+
+- PressureCurve gives the pressure a pump sees some minutes into a test
+- EmulatedPump answers the ru/st/cc/pr commands on a pty like a real pump
+- bench runs Acquisitions against emulated pumps and reports how they kept up
+
+Run this module to serve some pumps, or to benchmark the acquisition loop:
+
+    python emulator.py --pumps 4
+    python emulator.py --bench --rigs 4 --interval 1 --minutes 2 --speed 30
+
+Add the printed ports to 'extra ports' in the settings to use them from the
+app. Pseudo-terminals need a posix OS.
+"""
+
+import argparse
+import os
+import random
+import select
+import threading
+import time
+import tty
+from typing import Optional
+
+from pump import CODES
+
+
+class PressureCurve():
+    """Pressure over a test: a flat baseline, then scale builds until failure.
+
+    After onset minutes the pressure grows by rate psi per minute, doubling
+    every doubling minutes, until it reaches failpsi. noise psi of random
+    wobble is added to every reading.
+    """
+
+    def __init__(self, baseline: float = 75, onset: float = 10,
+                 rate: float = 10, doubling: float = 5,
+                 failpsi: float = 1500, noise: float = 2):
+        """Init with the shape of the curve."""
+        self.baseline = baseline
+        self.onset = onset
+        self.rate = rate
+        self.doubling = doubling
+        self.failpsi = failpsi
+        self.noise = noise
+
+    def pressure(self, minutes: float) -> int:
+        """Return the pressure minutes into the test."""
+        psi = self.baseline
+        if minutes > self.onset:
+            scaling = minutes - self.onset
+            if self.doubling > 0:
+                psi += self.rate * self.doubling * (2 ** (scaling / self.doubling) - 1)
+            else:
+                psi += self.rate * scaling
+        psi = min(psi, self.failpsi)
+        psi += random.uniform(-self.noise, self.noise)
+        return max(round(psi), 0)
+
+
+class EmulatedPump():
+    """A pump answering on one end of a pseudo-terminal.
+
+    Open port with pyserial like any other device. Replies are held back
+    latency seconds, give or take jitter. With probability drop a reply is
+    cut short, and with probability timeout it never comes, to exercise
+    the retries in Pump.command. speed runs the pressure curve faster than
+    the clock, so a 90 minute test can be tried in a few minutes.
+    """
+
+    def __init__(self, curve: Optional[PressureCurve] = None, latency: float = 0.01,
+                 jitter: float = 0.0, drop: float = 0.0, timeout: float = 0.0,
+                 speed: float = 1.0):
+        """Open a pty pair and start answering on it."""
+        self.curve = curve if curve is not None else PressureCurve()
+        self.latency = latency
+        self.jitter = jitter
+        self.drop = drop
+        self.timeout = timeout
+        self.speed = speed
+        self.started: Optional[float] = None  # monotonic time of the last 'ru', None if stopped
+        self.commands = 0
+        self.faults = 0
+        self.master, self.slave = os.openpty()
+        # no echo or line editing, so commands arrive as they were written
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.closed = False
+        self.thread = threading.Thread(
+            target=self.serve, name=f"emulator {self.port}", daemon=True
+        )
+        self.thread.start()
+
+    def minutes(self) -> float:
+        """Return how far into the pressure curve the pump is."""
+        if self.started is None:
+            return 0.0
+        return (time.monotonic() - self.started) / 60 * self.speed
+
+    def reply(self, code: str) -> bytes:
+        """Return the reply to a command code."""
+        if code == CODES['run']:
+            if self.started is None:
+                self.started = time.monotonic()
+            return b'OK/'
+        if code == CODES['stop']:
+            self.started = None
+            return b'OK/'
+        if code in (CODES['info'], CODES['pressure']):
+            psi = self.curve.pressure(self.minutes()) if self.started else 0
+            if code == CODES['pressure']:
+                return f"OK,{psi:04d}/".encode()
+            running = 1 if self.started else 0
+            return f"OK,{psi:04d},10.00,{running}/".encode()
+        return b'Er/'
+
+    def serve(self) -> None:
+        """Answer two letter commands until closed."""
+        pending = b''
+        while not self.closed:
+            try:
+                ready, _, _ = select.select([self.master], [], [], 0.2)
+                if not ready:
+                    continue
+                pending += os.read(self.master, 64)
+            except (OSError, ValueError):
+                return  # closed under us
+            while len(pending) >= 2:
+                code, pending = pending[:2].decode(errors='replace'), pending[2:]
+                self.commands += 1
+                answer = self.reply(code)
+                roll = random.random()
+                if roll < self.timeout:
+                    self.faults += 1
+                    continue
+                if roll < self.timeout + self.drop:
+                    self.faults += 1
+                    answer = answer[:len(answer) // 2]
+                delay = self.latency + random.uniform(0, self.jitter)
+                if delay > 0:
+                    time.sleep(delay)
+                try:
+                    os.write(self.master, answer)
+                except OSError:
+                    return
+
+    def close(self) -> None:
+        """Stop answering and close the pty."""
+        self.closed = True
+        self.thread.join(timeout=1)
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def bench(pumps: list, interval: float, minutes: float, failpsi: int = 1500,
+          concurrent: bool = True, folder: str = '.') -> list:
+    """Run an Acquisition for each pair of pumps at once and return summaries.
+
+    Each summary is the list of messages its Acquisition logged at the end.
+    """
+    # imported here so serving pumps doesn't need the acquisition stack
+    from acquisition import Acquisition, HEADER_ROW
+    from ringbuffer import RingBuffer
+
+    acquisitions = []
+    for rig in range(len(pumps) // 2):
+        messages: list = []
+        settings = {
+            'port1': pumps[rig * 2].port,
+            'port2': pumps[rig * 2 + 1].port,
+            'outpath': os.path.join(folder, f"bench_rig{rig + 1}.csv"),
+            'interval': interval,
+            'time limit': minutes,
+            'failpsi': failpsi,
+            'capacity': round(minutes * 60 / interval) + 2,
+            'catch up': False,
+            'concurrent': concurrent,
+            'flush rows': 10,
+            'flush seconds': 5,
+            'fsync': True,
+            'pump': {'budget': 0.5, 'retries': 2},
+        }
+        buffer = RingBuffer(settings['capacity'], HEADER_ROW[2:])
+        acquisition = Acquisition(
+            settings, buffer, lambda *msgs, to=messages: to.extend(msgs),
+            lambda: True
+        )
+        if not acquisition.open():
+            raise OSError(f"Couldn't open the pumps for rig {rig + 1}")
+        acquisitions.append((acquisition, messages))
+
+    def run(acquisition, messages):
+        acquisition.run()
+        del messages[:]  # keep only what close reports
+        acquisition.close()
+
+    threads = [
+        threading.Thread(target=run, args=pair, daemon=True)
+        for pair in acquisitions
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [[f"{msg}" for msg in messages] for _, messages in acquisitions]
+
+
+def main(argv=None) -> None:
+    """Serve or benchmark emulated pumps from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pumps', type=int, default=2,
+                        help="how many pumps to serve")
+    parser.add_argument('--bench', action='store_true',
+                        help="run acquisitions against the pumps, then quit")
+    parser.add_argument('--rigs', type=int, default=1,
+                        help="how many rigs to bench, two pumps each")
+    parser.add_argument('--interval', type=float, default=3,
+                        help="bench reading interval in seconds")
+    parser.add_argument('--minutes', type=float, default=1,
+                        help="bench test length in minutes")
+    parser.add_argument('--sequential', action='store_true',
+                        help="bench without concurrent polling")
+    parser.add_argument('--out', default='.',
+                        help="folder for the bench's csv files")
+    parser.add_argument('--latency', type=float, default=0.01,
+                        help="seconds before each reply")
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help="up to this many extra seconds per reply")
+    parser.add_argument('--drop', type=float, default=0.0,
+                        help="chance a reply is cut short")
+    parser.add_argument('--timeout', type=float, default=0.0,
+                        help="chance a reply never comes")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="how much faster than the clock pressure builds")
+    parser.add_argument('--baseline', type=float, default=75)
+    parser.add_argument('--onset', type=float, default=10,
+                        help="minutes before scale starts to build")
+    parser.add_argument('--rate', type=float, default=10,
+                        help="psi per minute once scale starts to build")
+    parser.add_argument('--failpsi', type=float, default=1500)
+    args = parser.parse_args(argv)
+
+    count = args.rigs * 2 if args.bench else args.pumps
+    pumps = [
+        EmulatedPump(
+            PressureCurve(args.baseline, args.onset, args.rate,
+                          failpsi=args.failpsi),
+            latency=args.latency, jitter=args.jitter,
+            drop=args.drop, timeout=args.timeout, speed=args.speed
+        )
+        for _ in range(count)
+    ]
+    try:
+        if args.bench:
+            print(f"Benching {args.rigs} rig(s) at {args.interval} s "
+                  f"for {args.minutes} min")
+            summaries = bench(
+                pumps, args.interval, args.minutes, round(args.failpsi),
+                concurrent=not args.sequential, folder=args.out
+            )
+            for rig, summary in enumerate(summaries):
+                print(f"Rig {rig + 1}")
+                for line in summary:
+                    print(f"  {line}")
+            for pump in pumps:
+                print(f"{pump.port}: {pump.commands} commands, "
+                      f"{pump.faults} faults injected")
+        else:
+            print("Serving pumps on", ", ".join(pump.port for pump in pumps))
+            print("Press Ctrl+C to stop")
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pump in pumps:
+            pump.close()
+
+
+if __name__ == '__main__':
+    main()
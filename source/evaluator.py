@@ -1,136 +1,265 @@
-"""Analyses the data and returns a tuple of results."""
+"""Analyses the data and returns an Evaluation of the results.
+
+- evaluate scores a project's blanks and trials
+- Evaluation holds the numbers, and writes out the calculations log on request
+- SeriesResult holds the numbers worked out for one blank or trial
+"""
 
 import time
-from pandas import DataFrame
+import numpy as np
 
 
-def evaluate(proj, blanks, trials, baseline, xlim, ylim, interval):
-    """Evaluate the data."""
-    log = []
+def pack(series: list) -> np.ndarray:
+    """Return a 2-D float array with a row per Series, padded with NaN."""
+    width = max([len(each) for each in series], default=0)
+    packed = np.full((len(series), width), np.nan)
+    for row, each in enumerate(series):
+        packed[row, :len(each)] = np.asarray(each, dtype=float)
+    return packed
+
+
+def measure(packed: np.ndarray) -> tuple:
+    """Return the number of readings, their sum and max for each row.
+
+    NaNs are skipped wherever they are, the same as dropna would.
+    """
+    present = ~np.isnan(packed)
+    measures = present.sum(axis=1)
+    sums = np.where(present, packed, 0).sum(axis=1)
+    # an empty row has no max, as with an empty Series
+    maxes = np.full(len(packed), np.nan)
+    some = measures > 0
+    maxes[some] = np.nanmax(packed[some], axis=1)
+    return measures, sums, maxes
+
+
+class SeriesResult():
+    """The numbers worked out for one blank or trial.
+
+    Blanks fill in over_blank and protectable, trials fill in
+    failure_region, new_area, ratio and score, the rest are left as None.
+    """
+
+    __slots__ = (
+        'name', 'measures', 'duration', 'max_psi', 'scale_area',
+        'over_blank', 'protectable',
+        'failure_region', 'new_area', 'ratio', 'score'
+    )
+
+    def __init__(self, name: str, measures: int, duration: float,
+                 max_psi: float, scale_area: int):
+        """Init with what blanks and trials have in common."""
+        self.name = name
+        self.measures = measures
+        self.duration = duration  # minutes
+        self.max_psi = max_psi
+        self.scale_area = scale_area
+        self.over_blank = None
+        self.protectable = None
+        self.failure_region = None
+        self.new_area = None
+        self.ratio = None
+        self.score = None
+
+
+class Evaluation():
+    """The outcome of evaluating a project.
+
+    Holds the project's areas and a SeriesResult for every blank and
+    trial. The calculations log is only written out when log is called.
+    """
+
+    __slots__ = (
+        'project', 'baseline', 'xlim', 'ylim', 'interval', 'max_measures',
+        'total_area', 'baseline_area', 'avail_area', 'protectable',
+        'blanks', 'trials', 'seconds', '_log'
+    )
+
+    def __init__(self, project: str, baseline: float, xlim: float,
+                 ylim: float, interval: int):
+        """Init with the project's parameters and no results yet."""
+        self.project = project
+        self.baseline = baseline
+        self.xlim = xlim
+        self.ylim = ylim
+        self.interval = interval
+        self.max_measures = round(xlim * 60 / interval)
+        self.total_area = round(ylim * self.max_measures)
+        self.baseline_area = round(baseline * self.max_measures)
+        self.avail_area = self.total_area - self.baseline_area
+        self.protectable = None  # the blanks' average
+        self.blanks = []
+        self.trials = []
+        self.seconds = 0.0  # how long scoring took
+        self._log = None
+
+    @property
+    def blank_times(self) -> list:
+        """How long each blank ran, in seconds."""
+        return [round(blank.measures * self.interval, 2) for blank in self.blanks]
+
+    @property
+    def result_titles(self) -> list:
+        """The name of each trial."""
+        return [f"{trial.name}" for trial in self.trials]
 
-    def _log(*msgs):
-        """Append string(s) to a list to be returned with the results_queue."""
-        for msg in msgs:
-            print(f"{msg}")
-            log.append(f"{msg}")
+    @property
+    def result_values(self) -> list:
+        """Each trial's score as a percentage string."""
+        return [
+            f"{trial.score}%"
+            if trial.score <= 100  # say 100% not 100.0%
+            else "100%"
+            for trial in self.trials
+        ]
 
-    line = '\n' + '-' * 75 + '\n'
-    _log(f"\nBeginning evaluation of {proj}" + line * 2)
+    @property
+    def durations(self) -> list:
+        """How long each trial ran in minutes, up to the time limit."""
+        return [trial.duration for trial in self.trials]
+
+    @property
+    def max_psis(self) -> list:
+        """Each trial's highest pressure, up to the failing pressure."""
+        return [
+            round(trial.max_psi)
+            if round(trial.max_psi) <= self.ylim
+            else self.ylim
+            for trial in self.trials
+        ]
+
+    def log(self) -> list:
+        """Return the calculations log as a list of strings."""
+        if self._log is None:
+            self._log = self.render()
+        return self._log
+
+    def render(self) -> list:
+        """Write out every step of the calculations."""
+        log = []
+        _log = log.append
+        baseline, xlim, ylim = self.baseline, self.xlim, self.ylim
+        interval, max_measures = self.interval, self.max_measures
+        baseline_area, avail_area = self.baseline_area, self.avail_area
+
+        line = '\n' + '-' * 75 + '\n'
+        _log(f"\nBeginning evaluation of {self.project}" + line * 2)
+        _log(f"baseline = {round(baseline)} psi")
+        _log(f"time limit = {round(xlim * 60)} s")
+        _log(f"failing pressure threshold: {round(ylim)} psi")
+        _log(f"reading interval = {interval} s/reading")
+        _log(f"max measures = {round(xlim * 60)} / {interval} = {max_measures}")
+        _log(f"total area =  {ylim} * {max_measures} = {self.total_area} psi")
+        _log("baseline area = baseline pressure * max measures")
+        _log(f"baseline area = {baseline} * {max_measures} = {baseline_area} psi")
+        _log("avail area = total area - baseline area")
+        _log(f"avail area =  {self.total_area} - {baseline_area} = {avail_area} psi")
+        _log(line)
+
+        for blank in self.blanks:
+            _log(f"{blank.name}")
+            _log(f"blank duration = {blank.duration} min")
+            _log(f"number of measurements = {blank.measures}")
+            _log(f"max psi = {int(round(blank.max_psi))}")
+            _log(f"scale area = sum of all pressure readings = {blank.scale_area} psi")
+            _log("area over blank = fail psi * measures - scale area")
+            _log(f"area over blank = {ylim} * {blank.measures} - {blank.scale_area}")
+            _log(f"area over blank = {blank.over_blank} psi")
+            _log("protectable area =  avail area - area over blank")
+            _log(f"protectable area = {avail_area} - {blank.over_blank}")
+            _log(f"protectable area = {blank.protectable} psi\n")
+
+        _log(f"average protectable area = {self.protectable} psi" + line)
+
+        for trial in self.trials:
+            _log(f"{trial.name}")
+            duration = round(trial.measures * interval / 60, 3)
+            if duration > xlim:
+                _log(f"trial duration {duration} min is longer than {xlim} min")
+                _log(f"truncating duration to {xlim} min (doesn't affect score)")
+            _log(f"trial duration = {trial.duration} min")
+            _log(f"number of measurements = {trial.measures}")
+            _log(f"max psi = {int(round(trial.max_psi))}")
+            _log(f"scale area = sum of all pressure readings = {trial.scale_area} psi")
+            # check if this was a passing run or not
+            if trial.measures < max_measures:
+                _log(
+                    f"trial length {trial.measures} < {max_measures} for a passing run"
+                )
+            else:
+                _log(
+                    f"trial length {trial.measures} >= {max_measures} for a passing run"
+                )
+            _log(f"failure region = {trial.failure_region} psi")
+            _log(f"deducting baseline area {baseline_area} psi")
+            _log("new scale area =  scale area + failure region - baseline area")
+            new_scale_text = f"{trial.new_area} + {trial.failure_region} - {baseline_area}"
+            _log("new scale area = " + new_scale_text)
+            _log(f"new scale area = {trial.new_area} psi")
+            _log(f"scale ratio = scale area / protectable area = {trial.ratio}")
+            _log(f"score = (1 - scale ratio)*100 = {trial.score}%" + line)
+
+        _log(line * 2)
+        _log(f"Finished evaluation in {round(self.seconds, 3)} s\n")
+        return log
+
+
+def evaluate(proj, blanks, trials, baseline, xlim, ylim, interval) -> Evaluation:
+    """Evaluate the data."""
     start = time.time()
+    evaluation = Evaluation(proj, baseline, xlim, ylim, interval)
+    max_measures = evaluation.max_measures
+
+    # work out every series' numbers at once, then sort them into results
+    blank_measures, blank_sums, blank_maxes = measure(pack(blanks))
+    blank_areas = np.round(blank_sums)
+    over_blanks = ylim * blank_measures - blank_areas
+    blank_scores = np.round(evaluation.avail_area - over_blanks)
 
-    max_measures = round(xlim * 60 / interval)
-    total_area = round(ylim * max_measures)
-    baseline_area = round(baseline * max_measures)
-    avail_area = total_area - baseline_area
-
-    _log(f"baseline = {round(baseline)} psi")
-    _log(f"time limit = {round(xlim * 60)} s")
-    _log(f"failing pressure threshold: {round(ylim)} psi")
-    _log(f"reading interval = {interval} s/reading")
-    _log(f"max measures = {round(xlim * 60)} / {interval} = {max_measures}")
-    _log(f"total area =  {ylim} * {max_measures} = {total_area} psi")
-    _log("baseline area = baseline pressure * max measures")
-    _log(f"baseline area = {baseline} * {max_measures} = {baseline_area} psi")
-    _log("avail area = total area - baseline area")
-    _log(f"avail area =  {total_area} - {baseline_area} = {avail_area} psi")
-    _log(line)
-
-    blank_scores = []
-    blank_times = []
-
-    for blank in blanks:
-        blank = blank.dropna()
-        blank_times.append(round(len(blank) * interval, 2))
-        _log(blank.name)
-        measures = len(blank)
-        _log(f"blank duration = {round(measures * interval / 60, 3)} min")
-        _log(f"number of measurements = {measures}")
-        _log(f"max psi = {int(round(blank.max()))}")
-        scale_area = round(blank.sum())
-        _log(f"scale area = sum of all pressure readings = {scale_area} psi")
-        over_blank = ylim * measures - scale_area
-        _log("area over blank = fail psi * measures - scale area")
-        _log(f"area over blank = {ylim} * {measures} - {scale_area}")
-        _log(f"area over blank = {over_blank} psi")
-        protectable = round(avail_area - over_blank)
-        _log("protectable area =  avail area - area over blank")
-        _log(f"protectable area = {avail_area} - {over_blank}")
-        _log(f"protectable area = {protectable} psi\n")
-        blank_scores.append(protectable)
-
-    protectable = int(round(DataFrame(blank_scores).mean()))
-    _log(f"average protectable area = {protectable} psi" + line)
-
-    scores = {}
-    durations = []
-
-    for trial in trials:
-        trial = trial.dropna()
-        _log(trial.name)
-        measures = len(trial)
+    for i, blank in enumerate(blanks):
+        measures = int(blank_measures[i])
+        result = SeriesResult(
+            blank.name,
+            measures,
+            round(measures * interval / 60, 3),
+            float(blank_maxes[i]),
+            int(blank_areas[i])
+        )
+        result.over_blank = ylim * measures - result.scale_area
+        result.protectable = int(blank_scores[i])
+        evaluation.blanks.append(result)
+
+    protectable = int(round(blank_scores.mean()))
+    evaluation.protectable = protectable
+
+    trial_measures, trial_sums, trial_maxes = measure(pack(trials))
+    trial_areas = np.round(trial_sums)
+    # ylim per would-be measure for runs that failed before the time limit
+    failure_regions = np.where(
+        trial_measures < max_measures,
+        np.round(ylim * (max_measures - trial_measures)),
+        0
+    )
+    new_areas = trial_areas + failure_regions - evaluation.baseline_area
+    scale_ratios = new_areas / protectable
+
+    for i, trial in enumerate(trials):
+        measures = int(trial_measures[i])
         duration = round(measures * interval / 60, 3)
         if duration > xlim:
-            _log(f"trial duration {duration} min is longer than {xlim} min")
-            _log(f"truncating duration to {xlim} min (doesn't affect score)")
-            duration = xlim
-        durations.append(duration)
-        _log(f"trial duration = {duration} min")
-        _log(f"number of measurements = {measures}")
-        scale_area = round(trial.sum())
-        _log(f"max psi = {int(round(trial.max()))}")
-        _log(f"scale area = sum of all pressure readings = {scale_area} psi")
-
-        # check if this was a passing run or not
-        if measures < max_measures:
-            _log(
-                f"trial length {measures} < {max_measures} for a passing run"
-            )
-            # ylim per would-be measure
-            failure_region = round(ylim * (max_measures - measures))
-        else:
-            _log(
-                f"trial length {measures} >= {max_measures} for a passing run"
-            )
-            failure_region = 0
-
-        _log(f"failure region = {failure_region} psi")
-        _log(f"deducting baseline area {baseline_area} psi")
-        scale_area = scale_area + failure_region - baseline_area
-        _log("new scale area =  scale area + failure region - baseline area")
-        new_scale_text = f"{scale_area} + {failure_region} - {baseline_area}"
-        _log("new scale area = " + new_scale_text)
-        _log(f"new scale area = {scale_area} psi")
-        scale_ratio = float(scale_area / protectable)
-        _log(f"scale ratio = scale area / protectable area = {scale_ratio}")
-        score = round((1 - scale_ratio) * 100, 1)
+            duration = xlim  # doesn't affect the score
+        result = SeriesResult(
+            trial.name, measures, duration, float(trial_maxes[i]),
+            int(trial_areas[i])
+        )
+        result.failure_region = int(failure_regions[i])
+        result.new_area = int(new_areas[i])
+        result.ratio = float(scale_ratios[i])
+        score = round((1 - result.ratio) * 100, 1)
         if score >= 100:
             score = 100
-        _log(f"score = (1 - scale ratio)*100 = {score}%" + line)
-        scores[trial.name] = score
-
-    result_titles = [f"{i}" for i in scores]
-    result_values = [
-        f"{scores[i]}%"
-        if scores[i] <= 100  # say 100% not 100.0%
-        else "100%"
-        for i in scores
-    ]
-    max_psis = [
-        round(trial.max())
-        if round(trial.max()) <= ylim
-        else ylim
-        for trial in trials
-    ]
-
-    results_queue = {}
-    results_queue['blank_times'] = blank_times
-    results_queue['result_titles'] = result_titles
-    results_queue['result_values'] = result_values
-    results_queue['durations'] = durations
-    results_queue['baseline'] = baseline
-    results_queue['ylim'] = ylim
-    results_queue['max_psis'] = max_psis
-
-    _log(line * 2)
-    _log(f"Finished evaluation in {round(time.time() - start, 3)} s\n")
-    return results_queue, log
+        result.score = score
+        evaluation.trials.append(result)
+
+    evaluation.seconds = time.time() - start
+    return evaluation
@@ -1,19 +1,22 @@
 """A class to handle the logic for running the test."""
 
-import csv  # logging the data
+import multiprocessing
+from multiprocessing import shared_memory
 import os  # handling file paths
+import sqlite3
 import time  # sleeping
-import serial
-from serial import SerialException
+
+from acquisition import Acquisition, acquire_in_process, HEADER_ROW
+from ringbuffer import RingBuffer
 
 
 class Experiment():
     """A class to handle the logic for running the test."""
 
     def __init__(self, parent, port1, port2, timelimit, failpsi, chem, conc):
-        """Collect all the user data from the MainWindow widgets."""
-        self.mainwin = parent
-        self.core = self.mainwin.core
+        """Collect all the user data from the Rig widgets."""
+        self.rig = parent
+        self.core = self.rig.core
         self.port1 = port1
         self.port2 = port2
         self.time_limit = timelimit
@@ -21,32 +24,33 @@ class Experiment():
         self.chem = chem
         self.conc = conc
         self.running = False
-        self.elapsed = 0
-        self.readings = 0
+        self.started = False  # whether the RigManager has accepted the test
         self.interval = self.core.parser.getint(
             'test settings', 'interval seconds'
         )
         if self.interval <= 1:
             print("Reading interval cannot be less than 1, increasing the interval to 1")
             self.interval = 1
+        # reading in another process keeps the GUI from stalling a reading
+        self.in_process = self.core.parser.getboolean(
+            'test settings', 'acquisition process', fallback=False
+        )
 
-        print("Disabling MainWindow test parameter entries")
-        for child in self.mainwin.param_widgets:
+        print(f"Disabling {self.rig.name} test parameter entries")
+        for child in self.rig.param_widgets:
             child.configure(state="disabled")
 
-        print("Enabling MainWindow test controls")
-        self.mainwin.def_pump.configure(state='readonly')
-        self.mainwin.run_btn.configure(state='normal')
-        self.mainwin.end_btn.configure(state='normal')
+        print(f"Enabling {self.rig.name} test controls")
+        self.rig.def_pump.configure(state='readonly')
+        self.rig.run_btn.configure(state='normal')
+        self.rig.end_btn.configure(state='normal')
 
         # clear the text widget
-        self.mainwin.data_out.configure(state='normal')
-        self.mainwin.data_out.delete(1.0, 'end')
-        self.mainwin.data_out.configure(state='disabled')
+        self.rig.log_sink.clear()
 
         # set up an output file
         file_name = f"{self.chem}_{self.conc}.csv"
-        self.outpath = os.path.join(self.mainwin.project, file_name)
+        self.outpath = os.path.join(self.rig.project, file_name)
         # make sure we don't overwrite existing data
         while os.path.isfile(self.outpath):  # we haven't made one yet
             self.to_log("A file with that name already exists",
@@ -56,126 +60,176 @@ class Experiment():
         self.to_log(f"Creating output file at \n{self.outpath}")
         print(f"Creating output file at \n{self.outpath}")
 
-        header_row = ["Timestamp", "Seconds", "Minutes", "Pump 1", "Pump 2"]
-        with open(self.outpath, "w") as file:
-            csv.writer(file, delimiter=',').writerow(header_row)
-
-        # the timeout values are an alternative to using TextIOWrapper
-        # the values chosen were suggested by the pump's documentation
-        try:
-            self.pump1 = serial.Serial(self.port1, timeout=0.05)
-            self.pump2 = serial.Serial(self.port2, timeout=0.05)
-        except SerialException:
-            self.to_log("Could not establish a connection to the pumps",
-                        "Try resetting the port connections")
-            print("Disabling MainWindow test controls")
-            for child in (self.mainwin.run_btn, self.mainwin.end_btn):
+        parser = self.core.parser
+        self.settings = {
+            'port1': self.port1,
+            'port2': self.port2,
+            'outpath': self.outpath,
+            'interval': self.interval,
+            'time limit': self.time_limit,
+            'failpsi': self.failpsi,
+            'capacity': round(self.time_limit * 60 / self.interval) + 2,
+            'catch up': parser.getboolean(
+                'test settings', 'catch up missed readings', fallback=False
+            ),
+            'concurrent': parser.getboolean(
+                'test settings', 'concurrent polling', fallback=True
+            ),
+            'flush rows': parser.getint(
+                'test settings', 'flush every rows', fallback=10
+            ),
+            'flush seconds': parser.getfloat(
+                'test settings', 'flush every seconds', fallback=5
+            ),
+            'fsync': parser.getboolean(
+                'test settings', 'fsync on end', fallback=True
+            ),
+            'pump': {
+                'budget': parser.getfloat(
+                    'test settings', 'pump reply budget seconds', fallback=0.5
+                ),
+                'retries': parser.getint(
+                    'test settings', 'pump retries', fallback=2
+                ),
+            },
+        }
+
+        # the live plot reads from here instead of parsing the output file
+        self.buffer = RingBuffer(self.settings['capacity'], HEADER_ROW[2:])
+        if self.in_process:
+            # relay_process shares the buffer with the worker once it's run,
+            # and the worker opens the file and pumps when it starts
+            self.shm = None
+            return
+
+        # the broker shares the ports with the Pump Controller
+        self.acquisition = Acquisition(
+            self.settings, self.buffer, self.to_log, lambda: self.running,
+            connect=self.core.broker.connect
+        )
+        if not self.acquisition.open():
+            print(f"Disabling {self.rig.name} test controls")
+            for child in (self.rig.run_btn, self.rig.end_btn):
                 child.configure(state="disabled")
-            print("Enabling MainWindow parameter entries")
-            for child in self.mainwin.param_widgets:
+            print(f"Enabling {self.rig.name} parameter entries")
+            for child in self.rig.param_widgets:
                 child.configure(state="normal")
 
     def to_log(self, *msgs) -> None:
         """Pass str messages to the parent widget's to_log method."""
-        self.mainwin.to_log(*msgs)
+        self.rig.to_log(*msgs)
 
     def run_test(self) -> None:
-        """Submit a test loop to the thread_pool_executor."""
+        """Submit a test loop to the core's RigManager."""
         if not self.running:
             self.to_log("Starting the test")
-            self.core.thread_pool_executor.submit(self.take_reading)
+            # set first so the loop doesn't see a stopped test
             self.running = True
+            self.running = self.core.rig_manager.start(self)
+            self.started = self.running
+            if not self.started:
+                # let go of the file and ports, the test has to be set up again
+                self.abandon()
+                self.reset_controls()
+                self.to_log("The test wasn't started, set it up again to retry")
+
+    def abandon(self) -> None:
+        """Let go of what was opened for a test that was never run."""
+        if self.started:
+            return
+        self.started = True  # only once
+        print(f"Abandoning the unused test at {self.outpath}")
+        if not self.in_process:
+            self.acquisition.discard()
 
     def take_reading(self) -> None:
-        """Loop to be handled by the thread_pool_executor."""
-        for pump in (self.pump1, self.pump2):
-            pump.write('ru'.encode())
-        # let the pumps warm up before we start recording data
-        time.sleep(3)
-
-        # a dict to hold recent pressure readings
-        psi1, psi2 = 0, 0
-        self.readings = 0
-        starttime = time.time()
-        reading_start = -1 * self.interval  # so that the first if doesnt fail
-        snooze = self.interval * 0.9
-        while (
-                (psi1 < self.failpsi or psi2 < self.failpsi)
-                and (
-                    self.elapsed <= self.time_limit * 60
-                    or self.readings <= (self.time_limit * 60 / self.interval) - 2
-                )
-        ):
-            if time.time() - reading_start >= self.interval:
-                self.elapsed = time.time() - starttime
-                self.readings += 1
-                reading_ratio = self.elapsed / self.readings
-                rate_is_bad = reading_ratio - self.interval > 0.01
-                if self.readings != 0 and rate_is_bad:
-                    print(f"avg s/reading: {round(reading_ratio, 4)}")
-                reading_start = time.time()
-                try:
-                    for pump in (self.pump1, self.pump2):
-                        pump.write('cc'.encode())  # get current conditions
-                    psi1 = int(self.pump1.readline().decode().split(',')[1])
-                    psi2 = int(self.pump2.readline().decode().split(',')[1])
-                except SerialException as error:
-                    self.to_log(error)
-                this_data = [
-                    time.strftime("%I:%M:%S", time.localtime()),
-                    round(self.elapsed, 1),  # as seconds
-                    f"{self.elapsed/60:.2f}",  # as minutes
-                    psi1,
-                    psi2
-                ]
+        """Loop to be handled by the RigManager."""
+        # whatever happens, the ports and file are closed and the rig is idle again
+        try:
+            if self.in_process:
+                self.relay_process()
+            else:
                 try:
-                    with open(self.outpath, "a", newline='') as file:
-                        csv.writer(file, delimiter=',').writerow(this_data)
-                except Exception as error:
-                    self.to_log(error)
-                this_reading = (
-                    f"{self.elapsed/60:.2f} min, {psi1} psi, {psi2} psi"
-                )
-                self.to_log(this_reading)
-                time.sleep(snooze)
-
-                if not self.running:
-                    break
-                # end of while loop
-        print("Test complete")
-        self.end_test()
+                    self.acquisition.run()
+                finally:
+                    self.acquisition.close()
+        finally:
+            self.end_test()
+        try:
+            self.core.projects.index_run(self.outpath, rig=self.rig.name)
+        except (OSError, ValueError, sqlite3.Error) as error:
+            print(f"Couldn't add {self.outpath} to the project database")
+            print(error)
         for _ in range(3):
             print('\a')
             time.sleep(0.5)
 
-    def end_test(self) -> None:
-        """Stop the pumps and close their COM ports then swap button states."""
-        print("Ending the test")
-        try:
-            for pump in (self.pump1, self.pump2):
-                pump.write('st'.encode())
-                pump.close()
-        except SerialException as error:
-            print("Failed to send stop/close order to pump")
-            print(error)
-
+    def relay_process(self) -> None:
+        """Run the Acquisition in a worker process and relay its messages."""
+        # made here, so a test that's never run has nothing to unlink
+        self.shm = shared_memory.SharedMemory(
+            create=True,
+            size=RingBuffer.nbytes(self.settings['capacity'], len(HEADER_ROW[2:]))
+        )
+        self.buffer = RingBuffer(
+            self.settings['capacity'], HEADER_ROW[2:], self.shm.buf
+        )
+        # the worker has to open the ports itself, and nothing else may
+        self.core.broker.lend(self.port1, self.port2)
         try:
-            max_measures = round(self.elapsed / self.interval)
-            completion_rate = round(self.readings / max_measures * 100, 1)
-            if completion_rate >= 100:
-                completion_rate = 100
-            this_duration = f"{self.elapsed/60:.2f} min"
-            self.to_log(
-                f"Took {self.readings}/{max_measures} expected readings in {this_duration}"
-            )
-            self.to_log(f"Dataset is {completion_rate}% complete")
-        except ZeroDivisionError:
-            self.to_log("The test ended before any measurements were recorded")
+            self.relay_worker()
+        finally:
+            self.core.broker.reclaim(self.port1, self.port2)
+            # the plot may be reading the buffer, so let go of it on the Tk thread
+            self.core.ui_queue.post(self.release_shared_memory)
+
+    def relay_worker(self) -> None:
+        """Start the worker process and pass its messages on until it's done."""
+        conn, child_conn = multiprocessing.Pipe()
+        worker = multiprocessing.Process(
+            target=acquire_in_process,
+            args=(self.settings, self.shm.name, child_conn),
+            daemon=True
+        )
+        worker.start()
+        stop_sent = False
+        while True:
+            if not self.running and not stop_sent:
+                conn.send('stop')
+                stop_sent = True
+            if not conn.poll(0.25):
+                if not worker.is_alive():
+                    self.to_log("The acquisition process quit unexpectedly")
+                    break
+                continue
+            try:
+                kind, payload = conn.recv()
+            except EOFError:
+                break
+            if kind == 'log':
+                self.to_log(*payload)
+            elif kind == 'done':
+                break
+        worker.join(timeout=5)
+        conn.close()
+
+    def release_shared_memory(self) -> None:
+        """Keep a private copy of the readings and free the shared memory."""
+        self.buffer.detach()
+        self.shm.close()
+        self.shm.unlink()
 
+    def end_test(self) -> None:
+        """Mark the test as over, then swap button states."""
         self.running = False
+        # this usually runs on a RigManager thread, which can't touch Tk
+        self.core.ui_queue.post(self.reset_controls)
+
+    def reset_controls(self) -> None:
+        """Swap the rig's widgets back to accepting a new test."""
         # re-enable the entries to let user start new test
-        for child in self.mainwin.param_widgets:
+        for child in self.rig.param_widgets:
             child.configure(state="normal")
         # disable the run/end buttons until a new test is started
-        for child in self.mainwin.control_widgets:
+        for child in self.rig.control_widgets:
             child.configure(state="disabled")
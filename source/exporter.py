@@ -1,29 +1,22 @@
 """Exports a report."""
 
-from datetime import date
 import os
-import time
 import tkinter as tk
 from tkinter import ttk
 from tkinter import font  # type: ignore
 from tkinter.messagebox import showinfo, showerror
-import shutil
-import openpyxl
-import PIL
 
 from iconer import set_window_icon
+from reportwriter import write_report
 
 
 class ReportExporter(tk.Toplevel):
     """Docstring"""
-    def __init__(self, parent, project, results_queue):
+    def __init__(self, parent, project, evaluation):
         """Instantiate the core."""
         tk.Toplevel.__init__(self, parent)
         self.parent = parent
-        self.results_queue = results_queue
-        if len(self.results_queue) == 0:
-            self.parent.make_plot(**self.parent.prep_plot())
-            self.results_queue = self.parent.results_queue
+        self.evaluation = evaluation
 
         self.title('Project details')
         set_window_icon(self)
@@ -86,7 +79,7 @@ class ReportExporter(tk.Toplevel):
         water_quals = tk.LabelFrame(container, text="Water quality", font=bold_font)
         water_qual_ents = []
         clarities = ["Clear", "Slightly Hazy", "Hazy", "Other"]
-        for i, trial in enumerate(self.results_queue['result_titles']):
+        for i, trial in enumerate(self.evaluation.result_titles):
             tk.Label(water_quals, text=trial).grid(row=i, column=0, sticky='e')
             ent = ttk.Combobox(water_quals, values=clarities, justify='center')
             ent.grid(row=i, column=1, pady=1)
@@ -114,11 +107,10 @@ class ReportExporter(tk.Toplevel):
         details = [value.strip() for value in details]
         trial_clarities = [widget.get() for widget in water_qual_ents]
         trial_clarities = [value.strip() for value in trial_clarities]
-        self.results_queue['trial_clarities'] = trial_clarities
-        self.export_report(details)
+        self.export_report(details, trial_clarities)
 
-    def export_report(self, details):
-        """Export the reporter's results_queue to an .xlsx file."""
+    def export_report(self, details, trial_clarities):
+        """Export the reporter's Evaluation to an .xlsx file."""
         template_path = self.parent.parser.get('report settings', 'template path')
         if not os.path.isfile(template_path):
             showerror(
@@ -126,134 +118,15 @@ class ReportExporter(tk.Toplevel):
                 message="No valid template file found.\nYou can set the template path in Settings > Report Settings."
             )
             return
-        print("Preparing export")
-        start = time.time()
-        analysis_no = details[0]
-        company = details[1]
-        sample = details[2]
-        customer = details[3]
-        client = details[4]
-        sub_date = details[5]
-
-        def ret_num(str) -> int:
-            str = str.replace(",", "")
-            if str == "":
-                str = 0
-            return round(float(str))
-
-        temp = ret_num(details[6])
-        cl = ret_num(details[7])
-        bicarb_adj = ret_num(details[8])
-
-        file = f"{analysis_no.replace(' ', '')} {self.project[-1]} CaCO3 Scale Block Analysis.xlsx"
-        report_path = os.path.join(self.parent.mainwin.project, file)
-
-        print(f"Copying report template to\n{report_path}")
-        shutil.copyfile(template_path, report_path)
-
-        print(f"Populating file\n{report_path}")
-        workbook = openpyxl.load_workbook(report_path)
-        ws = workbook.active
-
-        img_filename = f"{self.project[-1]}.png"
-        img_path = os.path.join(self.parent.mainwin.project, img_filename)
-        print("Making temp resized plot image")
-        try:
-            img = PIL.Image.open(img_path)
-        except FileNotFoundError:
-            print("Couldn't find the plot image file, aborting export")
+        report_path = write_report(
+            template_path,
+            self.parent.mainwin.project,
+            self.evaluation,
+            details,
+            trial_clarities
+        )
+        if report_path is None:
             return
-        img = img.resize((667, 257))
-        img_path = img_filename[:-4]
-        img_path += "- temp.png"
-        img.save(img_path)
-        img = openpyxl.drawing.image.Image(img_path)
-        img.anchor = 'A28'
-        ws._images[1] = img
-
-        blank_times = self.results_queue['blank_times']
-        result_titles = self.results_queue['result_titles']
-        result_values = self.results_queue['result_values']
-        durations = self.results_queue['durations']
-        baseline = self.results_queue['baseline']
-        ylim = self.results_queue['ylim']
-        max_psis = self.results_queue['max_psis']
-        trial_clarities = self.results_queue['trial_clarities']
-
-        brine_comp = f"Synthetic Field Brine, Chlorides = {cl:,} mg/L"
-        if bicarb_adj != 0:
-            brine_comp += f" (Bicarbs increased to {bicarb_adj:,} mg/L)"
-        ws['D12'] = brine_comp
-
-        ws['D10'] = f"{temp} °F"
-
-        ws['C4'] = customer
-        ws['C5'] = client
-        ws['C6'] = company
-        ws['C7'] = sample
-        today = date.today().strftime("%B %d, %Y")
-        ws['I4'] = analysis_no
-        ws['I6'] = sub_date
-        ws['I7'] = f"{today}"
-        ws['D11'] = f"{baseline} psi"
-        ws['G16'] = round(ylim)
-
-        print(f"customer: {customer}")
-        print(f"company: {company}")
-        print(f"well / sample point: {sample}")
-
-        blank_time_cells = [f"E{i}" for i in range(16, 18)]
-        chem_name_cells = [f"A{i}" for i in range(19, 27)]
-        chem_conc_cells = [f"D{i}" for i in range(19, 27)]
-        duration_cells = [f"E{i}" for i in range(19, 27)]
-        max_psi_cells = [f"G{i}" for i in range(19, 27)]
-        protection_cells = [f"H{i}" for i in range(19, 27)]
-        clarity_cells = [f"J{i}" for i in range(19, 27)]
-
-        chem_names = [" ".join(title.split(' ')[:-2]) for title in result_titles]
-        chem_concs = [" ".join(title.split(' ')[-2:-1]) for title in result_titles]
-
-        for (cell, blank_time) in zip(blank_time_cells, blank_times):
-            ws[cell] = round(blank_time / 60, 2)
-        for (cell, name) in zip(chem_name_cells, chem_names):
-            ws[cell] = f"{name}"
-        for (cell, conc) in zip(chem_conc_cells, chem_concs):
-            ws[cell] = round(float(conc), 1)
-        for (cell, duration) in zip(duration_cells, durations):
-            ws[cell] = round(float(duration), 2)
-        for (cell, psi) in zip(max_psi_cells, max_psis):
-            ws[cell] = round(psi)
-        for (cell, score) in zip(protection_cells, result_values):
-            score = float(score[:-1])
-            if score >= 100:
-                score = 100
-            ws[cell] = score / 100  # the template has conditional % formatting
-        for(cell, clarity) in zip(clarity_cells, trial_clarities):
-            ws[cell] = clarity
-
-        rows_with_data = [16, 17, *range(19, 27)]  # where the data is
-        hide_rows = []  # rows we want to hide
-        resize_rows = []  # rows we want to resize
-
-        for i in rows_with_data:
-            if ws[f'A{i}'].value is None:  # if the cell is empty
-                hide_rows.append(i)  # add it to the list of rows to hide
-            else:
-                resize_rows.append(i)  # add it to the list of rows to reszie
-
-        row_height = 200 / len(resize_rows)  # we have ~200px to work with total
-        if row_height >= 30:  # we don't want any rows bigger than this
-            row_height = 30
-        for row in resize_rows:  # this does the resizing
-            ws.row_dimensions[row].height = row_height
-        for row in hide_rows:  # this hides the empty rows
-            ws.row_dimensions[row].hidden = True
-
-        print(f"Saving report to\n{report_path}")
-        workbook.save(filename=report_path)
-        print("Removing temp files")
-        os.remove(img_path)
-        print(f"Finished export in {round(time.time() - start, 2)} s")
         showinfo(
             parent=self,
             message=f"Report exported to\n{report_path}"
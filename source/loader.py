@@ -0,0 +1,62 @@
+"""Reads ScaleWiz data files, keeping only the columns that get plotted.
+
+Data files are written as Timestamp, Seconds, Minutes, Pump 1, Pump 2,
+with PSI 1 and PSI 2 in place of the pump columns in older files. The
+timestamp strings and seconds are never used after a test, so they're
+skipped, and the rest are read straight into small numeric types.
+"""
+
+import numpy as np
+from pandas import DataFrame, read_csv  # reading the data
+
+from tailreader import ALIASES
+
+COLUMNS = ('Minutes', 'Pump 1', 'Pump 2')
+# pressures are whole psi well under 32767, minutes need a fraction
+DTYPES = {'Minutes': np.float32, 'Pump 1': np.int16, 'Pump 2': np.int16}
+
+
+def header(path: str) -> dict:
+    """Return the file's name for each of COLUMNS that it has."""
+    with open(path, newline='') as file:
+        fields = [field.strip() for field in file.readline().split(',')]
+    names = {}
+    for field in fields:
+        name = ALIASES.get(field, field)
+        if name in COLUMNS and name not in names:
+            names[name] = field
+    return names
+
+
+def load(path: str) -> DataFrame:
+    """Return the Minutes, Pump 1 and Pump 2 columns of a data file.
+
+    Legacy pump names are renamed. Pressures that aren't whole numbers,
+    or rows cut short, fall back to float64 with NaN for the gaps. Raises
+    ValueError if the file has no Minutes or pump columns.
+    """
+    names = header(path)
+    if 'Minutes' not in names or len(names) < 2:
+        raise ValueError(f"{path} doesn't look like a ScaleWiz data file")
+    usecols = list(names.values())
+    dtype = {names[name]: DTYPES[name] for name in names}
+    try:
+        df = read_csv(path, usecols=usecols, dtype=dtype, skipinitialspace=True)
+    except (ValueError, OverflowError):
+        # a blank or fractional reading somewhere, so no ints
+        # full floats keep the sums, and so the scores, the same as before
+        dtype = {field: np.float64 for field in usecols}
+        dtype[names['Minutes']] = np.float32
+        df = read_csv(path, usecols=usecols, dtype=dtype, skipinitialspace=True)
+    df = df.rename(columns={field: name for name, field in names.items()})
+    df = df[[name for name in COLUMNS if name in df.columns]]
+    validate(path, df)
+    return df
+
+
+def validate(path: str, df: DataFrame) -> None:
+    """Warn about rows that are missing readings, eg. from a test that crashed."""
+    counts = df.count()
+    if counts.nunique() > 1:
+        short = ", ".join(f"{name} {count}" for name, count in counts.items())
+        print(f"{path} has {len(df)} rows but only some readings in them ({short})")
@@ -0,0 +1,73 @@
+"""Batches log messages into a text widget and keeps the full log on disk."""
+
+import collections
+import logging
+from logging.handlers import RotatingFileHandler
+
+
+def make_file_log(path: str, max_bytes: int = 1_000_000, backups: int = 5):
+    """Send everything logged under 'scalewiz' to a rotating file at path."""
+    logger = logging.getLogger('scalewiz')
+    logger.setLevel(logging.INFO)
+    handler = RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8'
+    )
+    handler.setFormatter(
+        logging.Formatter('%(asctime)s %(name)s: %(message)s')
+    )
+    logger.addHandler(handler)
+    return logger
+
+
+class LogSink():
+    """Queues messages for a ScrolledText and inserts them once per frame.
+
+    put may be called from any thread; it appends to a deque and posts a
+    flush to the UIQueue, keyed so every message in a frame shares one
+    flush. The flush inserts them all at once, trims the widget to
+    max_lines and hands the messages to a logger for the file.
+    """
+
+    def __init__(self, widget, logger, ui_queue, max_lines: int = 1000):
+        """Init with the ScrolledText to write to."""
+        self.widget = widget
+        self.logger = logger
+        self.ui_queue = ui_queue
+        self.max_lines = max_lines
+        self.queue = collections.deque()
+
+    def put(self, *msgs) -> None:
+        """Queue messages to be shown on the next frame."""
+        for msg in msgs:
+            self.queue.append(f"{msg}")
+        self.ui_queue.post(self.flush, key=self)
+
+    def flush(self) -> None:
+        """Insert every queued message into the widget in one go."""
+        msgs = []
+        while self.queue:
+            msgs.append(self.queue.popleft())
+        if not msgs:
+            return
+        for msg in msgs:
+            self.logger.info(msg)
+
+        self.widget.configure(state='normal')
+        self.widget.insert('end', '\n'.join(msgs) + '\n')
+        # the widget always ends with an empty line after the last newline
+        lines = int(self.widget.index('end-1c').split('.')[0]) - 1
+        if lines > self.max_lines:
+            self.widget.delete(1.0, f"{lines - self.max_lines + 1}.0")
+        self.widget.configure(state='disabled')
+        self.widget.see('end')
+
+    def clear(self) -> None:
+        """Drop queued messages and empty the widget."""
+        self.queue.clear()
+        self.widget.configure(state='normal')
+        self.widget.delete(1.0, 'end')
+        self.widget.configure(state='disabled')
+
+    def close(self) -> None:
+        """Flush what's left before the widget goes away."""
+        self.flush()
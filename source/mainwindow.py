@@ -1,25 +1,16 @@
 """The main window of the application.
 
 - imports then creates an instance of MenuBar
-- has some tkinter widgets for user input / data visualization
+- has a tab with a Rig for each pair of pumps on the bench
 """
 
 import os  # handling file paths
 import tkinter as tk  # GUI
 from tkinter import ttk
-from tkinter.scrolledtext import ScrolledText
-from tkinter import font  # type: ignore
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.ticker import MultipleLocator
-from pandas import DataFrame, read_csv  # reading data from csv
-import serial  # talking to the pumps
-import serial.tools.list_ports
-from serial import SerialException
-
-from experiment import Experiment
 from menubar import MenuBar
+from portscan import PortScanner
+from pump import extra_ports
+from rig import Rig
 
 
 class MainWindow(tk.Frame):
@@ -35,17 +26,17 @@ class MainWindow(tk.Frame):
 
         self.update_title()
         self.ports = []
-        self.port1_val = tk.StringVar()
-        self.port2_val = tk.StringVar()
-        self.port1_val.trace('w', self.check_unique_port1)
-        self.port2_val.trace('w', self.check_unique_port2)
-
-        self.param_widgets = []
-        self.control_widgets = []
+        # probes the ports in the background so the window shows up at once
+        self.port_scanner = PortScanner(
+            timeout=self.parser.getfloat(
+                'test settings', 'port probe timeout seconds', fallback=2
+            )
+        )
+        self.rigs = []
+        self.rigs_added = 0  # so a removed rig's name isn't reused
         self.build_window()
+        self.add_rig()
         self.update_port_boxes()
-        self.port1.set(self.ports[0])
-        self.port2.set(self.ports[1])
 
         style = ttk.Style()
         style.map('TCombobox', fieldbackground=[('readonly', 'white')])
@@ -53,297 +44,81 @@ class MainWindow(tk.Frame):
         style.map('TCombobox', selectforeground=[('readonly', 'black')])
 
     def build_window(self) -> None:
-        """Make all the tkinter widgets."""
-        bold_font = font.Font(font=font.nametofont("TkDefaultFont"))
-        bold_font.config(weight='bold')
-
-        # build the main frame
-        self.tst_frm = tk.Frame(self.core)  # top level container
-        # frame for parameter entries
-        self.ent_frm = tk.LabelFrame(
-            self.tst_frm,
-            text="Test parameters",
-            font=bold_font,
-        )
-        # a frame for test controls
-        self.cmd_frm = tk.LabelFrame(
-            self.tst_frm,
-            text="Test controls",
-            font=bold_font,
-        )
-        # define the self.ent_frm entries
-        self.port1 = ttk.Combobox(
-            self.ent_frm,
-            values=self.ports,
-            textvariable=self.port1_val,
-            width=9,
-            justify='center',
-            state='readonly',
-        )
-        self.port2 = ttk.Combobox(
-            self.ent_frm,
-            values=self.ports,
-            textvariable=self.port2_val,
-            width=9,
-            justify='center',
-            state='readonly',
-        )
-        self.chem = ttk.Entry(
-            self.ent_frm,
-            width=25,
-            justify='center'
-        )
-        self.conc = ttk.Entry(
-            self.ent_frm,
-            width=25,
-            justify='center'
-        )
-        self.strt_btn = ttk.Button(
-            self.ent_frm,
-            text="Start",
-            command=lambda: self.init_test()
-        )
-        # add to convenience list
-        for widget in (self.port1, self.port2, self.chem, self.conc, self.strt_btn):
-            self.param_widgets.append(widget)
-        # make entry labels for self.ent_frm
-        com_lbl = tk.Label(
-            self.ent_frm,
-            text="Device ports:",
-        )
-        chem_lbl = tk.Label(
-            self.ent_frm,
-            text="Chemical:",
-            anchor='e'
-        )
-        conc_lbl = tk.Label(
-            self.ent_frm,
-            text="Concentration:",
-            anchor='e'
-        )
-
-        # grid the labels
-        com_lbl.grid(row=0, sticky=tk.E)
-        chem_lbl.grid(row=3, sticky=tk.E)
-        conc_lbl.grid(row=4, sticky=tk.E)
-
-        # grid entries into self.ent_frm
-        self.port1.grid(row=0, column=1, sticky=tk.E, padx=(0, 4), pady=1)
-        self.port2.grid(row=0, column=2, sticky=tk.W, padx=(4, 0), pady=1)
-        self.chem.grid(row=3, column=1, columnspan=2, pady=1)
-        self.conc.grid(row=4, column=1, columnspan=2, pady=1)
-        self.strt_btn.grid(row=5, column=1, columnspan=2, pady=1)
-        cols = self.ent_frm.grid_size()[0]
-        for col in range(cols):
-            self.ent_frm.grid_columnconfigure(col, weight=1)
-
-        # a frame for the output panel
-        self.out_frm = tk.LabelFrame(
-            self.tst_frm,
-            # this spacing is to avoid using multiple labels
-            text="Elapsed,   Pump 1,   Pump 2",
-            font=bold_font,
-        )
-        self.data_out = ScrolledText(
-            master=self.out_frm,
-            width=45,
-            height=13,
-            state='disabled',
-            wrap='word',
-            bg='white'
-        )
-
-        self.data_out.pack()
-        if self.project is os.getcwd():
-            self.to_log(
-                "Click 'Set project folder' to choose the output directory"
-            )
+        """Make the notebook that holds a tab for each rig."""
+        self.rig_tabs = ttk.Notebook(self.core)
+        self.rig_tabs.grid(padx=3)
+
+    def add_rig(self) -> None:
+        """Add a tab for another pair of pumps."""
+        if len(self.rigs) >= self.core.rig_manager.max_rigs:
+            print(f"Can't add more than {self.core.rig_manager.max_rigs} rigs")
+            return
+        self.rigs_added += 1
+        name = f"Rig {self.rigs_added}"
+        print(f"Adding {name}")
+        rig = Rig(self.rig_tabs, self, name)
+        self.rigs.append(rig)
+        self.rig_tabs.add(rig, text=name)
+        self.rig_tabs.select(rig)
+        rig.set_ports(self.ports)
+        self.assign_ports(rig)
+
+    def remove_rig(self) -> None:
+        """Remove the selected rig's tab, unless it has a test running."""
+        if len(self.rigs) <= 1:
+            return
+        rig = self.current_rig()
+        if rig.running:
+            rig.to_log("Can't remove a rig while its test is running")
+            return
+        print(f"Removing {rig.name}")
+        if hasattr(rig, 'test'):
+            rig.test.abandon()
+        self.rigs.remove(rig)
+        self.rig_tabs.forget(rig)
+        rig.destroy()
+
+    def assign_ports(self, rig: Rig) -> None:
+        """Give a rig the next pair of ports no other rig has picked."""
+        taken = set()
+        for other in self.rigs:
+            if other is not rig:
+                taken.update((other.port1.get(), other.port2.get()))
+        free = [port for port in self.ports if port not in taken] + ["??", "??"]
+        rig.port1.set(free[0])
+        rig.port2.set(free[1])
+
+    def current_rig(self) -> Rig:
+        """Return the rig whose tab is selected."""
+        return self.rig_tabs.nametowidget(self.rig_tabs.select())
 
-        # build self.cmd_frm 4x3 grid
-        self.run_btn = ttk.Button(
-            master=self.cmd_frm,
-            text="Run",
-            command=lambda: self.test.run_test(),
-            width=15
-        )
-        self.end_btn = ttk.Button(
-            master=self.cmd_frm,
-            text="End",
-            command=lambda: self.end_test(),
-            width=15
-        )
-        self.run_btn.grid(row=1, column=0, padx=5, pady=2, sticky='e')
-        self.end_btn.grid(row=1, column=1, padx=5, pady=2, sticky='w')
-        cols = self.cmd_frm.grid_size()[0]
-        for col in range(cols):
-            self.cmd_frm.grid_columnconfigure(col, weight=1)
+    def to_log(self, *msgs) -> None:
+        """Log a message to the selected rig's Text widget."""
+        self.current_rig().to_log(*msgs)
 
-        tk.Label(
-            master=self.cmd_frm,
-            text="Select data to plot:"
-        ).grid(row=0, column=0, padx=5, sticky='e')
-        # combobox to choose which set of data to plot
-        self.def_pump = ttk.Combobox(
-            master=self.cmd_frm,
-            values=["Pump 1", "Pump 2"],
-            state='readonly',
-            justify='center',
-            width=13,
+    def update_port_boxes(self, force: bool = False) -> None:
+        """Rescan the ports in the background, then update every rig's Comboboxes."""
+        print("Finding connected devices")
+        held = self.core.rig_manager.ports() | self.core.broker.ports()
+        self.port_scanner.scan(
+            lambda ports: self.core.ui_queue.post(self.set_ports, ports, key='ports'),
+            held=held,
+            extra=extra_ports(self.parser),
+            force=force
         )
-        self.def_pump.set(self.parser.get('test settings', 'default pump'))
-
-        self.def_pump.grid(row=0, column=1, padx=5, sticky='w')
-
-        for widget in (self.run_btn, self.end_btn, self.def_pump):
-            self.control_widgets.append(widget)
-        # set up the plot area
-        self.plt_frm = tk.Frame(master=self.tst_frm)
 
-        # matplotlib objects
-        self.fig, self.axis = plt.subplots(figsize=(7.5, 4), dpi=100)
-        self.fig.patch.set_facecolor('#F0F0F0')
-        plt.subplots_adjust(left=0.10, bottom=0.12, right=0.97, top=0.95)
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self.plt_frm)
-        self.canvas.get_tk_widget().pack(side="top", fill="both", expand=True)
-        interval = self.parser.getint('test settings', 'interval seconds') * 1000
-        self.ani = FuncAnimation(self.fig, self.animate, interval=interval)
-
-        # grid stuff into self.tst_frm
-        self.ent_frm.grid(row=0, column=0, sticky='new')
-        self.plt_frm.grid(row=0, column=1, rowspan=3, sticky='nsew')
-        self.out_frm.grid(row=1, column=0, sticky='nsew')
-        self.cmd_frm.grid(row=2, column=0, sticky='sew')
-        self.tst_frm.grid(padx=3)
-
-        # widget bindings
-        self.chem.bind("<Return>", lambda _: self.conc.focus_set())
-        self.conc.bind("<Return>", lambda _: self.init_test())
-        com_lbl.bind("<Button-1>", lambda _: self.update_port_boxes())
-        for port in (self.port1, self.port2):
-            port.bind("<Button-1>", lambda _: self.update_port_boxes())
-            port.bind("<FocusIn>", lambda _: self.tst_frm.focus_set())
-        self.def_pump.bind("<FocusIn>", lambda _: self.tst_frm.focus_set())
-        self.run_btn.bind('<Return>', lambda _: self.test.run_test())
-        self.end_btn.bind('<Return>', lambda _: self.test.end_test())
-        # move the cursor here for convenience
-        self.chem.focus_set()
-        # disable the controls to prevent starting test w/o parameters
-        for widget in (self.control_widgets):
-            widget.configure(state="disabled")
-
-    def find_coms(self) -> list:
-        """Look for devices and returns a list of open ports."""
-        print("Finding connected devices")
-        ports = sorted([i.device for i in serial.tools.list_ports.comports()])
-        print(f"Found these devices: {ports}")
+    def set_ports(self, ports: list) -> None:
+        """Hand a fresh list of open ports to every rig."""
+        print(f"Successfully connected to devices {ports}")
         if len(ports) < 2:
             self.to_log("Not enough devices found...",
                         "Click 'Device ports:' to try again.")
-            ports = ["??", "??"]
-
-        open_ports = []
-        for port in ports:
-            if port != "??":
-                try:
-                    device = serial.Serial(port)
-                    device.close()
-                    open_ports.append(port)
-                except SerialException as error:
-                    self.to_log(f"Could not connect to port {port}")
-                    print(error)
-                    open_ports.append("??")
-            else:
-                open_ports.append("??")
-        print(f"Successfully connected to devices {open_ports}")
-        return open_ports
-
-    def update_port_boxes(self):
-        """Update the device port Comboboxes."""
-        self.ports = self.find_coms()
-        for port in (self.port1, self.port2):
-            port.configure(values=self.ports)
-
-        # update the list, each can be selected only once
-        if "?" in self.port1.get() or "?" in self.port2.get():
-            print("Disabling start button")
-            self.strt_btn.configure(state='disabled')
-        else:
-            self.data_out.configure(state='normal')
-            self.data_out.delete(1.0, 'end')
-            self.data_out.configure(state='normal')
-            print("Enabling start button")
-            self.strt_btn.configure(state='normal')
-
-    def check_unique_port1(self, *args):
-        """Make sure each selected port value is unique."""
-        if self.port1_val.get() == self.port2_val.get():
-            self.port2_val.set(self.ports[self.port2.current() - 1])
-
-    def check_unique_port2(self, *args):
-        """Make sure each selected port value is unique."""
-        if self.port2_val.get() == self.port1_val.get():
-            self.port1_val.set(self.ports[self.port1.current() - 1])
-
-    def init_test(self) -> None:
-        """Scrape form for user input, then init an Experiment object."""
-        print("Initializing a new Experiment")
-        params = {
-            'port1': self.port1.get().strip(),
-            'port2': self.port2.get().strip(),
-            'timelimit': self.parser.getint(
-                'test settings',
-                'time limit minutes'
-            ),
-            'failpsi': self.parser.getint('test settings', 'fail psi'),
-            'chem': self.chem.get().strip().replace(' ', '_'),
-            'conc': self.conc.get().strip().replace(' ', '_')
-        }
-        self.test = Experiment(self, **params)
-        self.run_btn.focus_set()
-
-    def end_test(self):
-        """Sets the test.running variable to False if it exists."""
-        if hasattr(self, 'test'):
-            self.test.running = False
-
-    def to_log(self, *msgs) -> None:
-        """Log a message to the Text widget in MainWindow's outfrm."""
-        for msg in msgs:
-            self.data_out.configure(state='normal')
-            self.data_out.insert('end', f"{msg}" + "\n")
-            self.data_out.configure(state='disabled')
-            self.data_out.see('end')
-
-    def animate(self, interval) -> None:
-        """Call animation function for the current test's data."""
-        try:
-            data = read_csv(self.test.outpath)
-        # maybe we didn't start running a test yet
-        except (FileNotFoundError, AttributeError):
-            data = DataFrame(data={'Minutes': [0], 'Pump 1': [0], 'Pump 2': [0]})
-
-        with plt.style.context('bmh'):
-            self.axis.clear()
-            self.axis.set_xlabel("Time (min)")
-            self.axis.set_ylabel("Pressure (psi)")
-            self.axis.set_ylim(top=self.parser.getint('test settings', 'fail psi'))
-            self.axis.yaxis.set_major_locator(MultipleLocator(100))
-            self.axis.set_xlim((0, None), auto=True)
-            self.axis.margins(0)
-            try:
-                y_data = data[self.def_pump.get()]
-            except KeyError:  # backwards compat w/ old data file header rows
-                pump = self.def_pump.get().replace("Pump", "PSI")
-                y_data = data[pump]
-            x_data = data['Minutes']
-            if self.chem.get() == "" and self.conc.get() == "":
-                label = " "
-            else:
-                label = f"{self.chem.get().strip()} {self.conc.get().strip()}"
-            self.axis.plot(x_data, y_data, label=label)
-            self.axis.grid(color='darkgrey', alpha=0.65, linestyle='-')
-            self.axis.set_facecolor('w')
-            self.axis.legend(loc=0)
+        self.ports = ports
+        for rig in self.rigs:
+            # a rig that didn't get ports before gets them now
+            if not rig.running and "?" in rig.port1.get() + rig.port2.get():
+                self.assign_ports(rig)
+            rig.set_ports(self.ports)
 
     def update_title(self) -> None:
         """Determine OS path format, then title the main window accordingly."""
@@ -360,12 +135,15 @@ class MainWindow(tk.Frame):
             title = os.getcwd()
         self.winfo_toplevel().title(title)
         print(f"Set main window title to {title}")
+        self.core.watcher.watch_project(self.project)
 
     def close_app(self) -> None:
         """Check if a test is running, then close the application."""
-        if hasattr(self, 'test'):
-            if self.test.running:
-                print("Can't close the application while a test is running")
-                return
+        if self.core.rig_manager.running:
+            print("Can't close the application while a test is running")
+            return
         print("Destroying root")
+        self.core.rig_manager.shutdown()
+        self.core.broker.shutdown()
+        self.core.watcher.stop()
         self.core.root.destroy()
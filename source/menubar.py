@@ -4,10 +4,7 @@ import tkinter as tk  # GUI
 from tkinter import filedialog
 import os  # handling file paths
 
-from reporter import Reporter
-from chlor_conc import ChlorConc
 from settings import ConfigManager
-from pumpops import PumpManager
 
 
 class MenuBar(tk.Frame):
@@ -30,19 +27,34 @@ class MenuBar(tk.Frame):
             command=lambda: self.askdir()
         )
 
+        self.menubar.add_command(
+            label="Add rig",
+            command=lambda: self.mainwin.add_rig()
+        )
+
+        self.menubar.add_command(
+            label="Remove rig",
+            command=lambda: self.mainwin.remove_rig()
+        )
+
+        self.menubar.add_command(
+            label="Watch data file",
+            command=lambda: self.mainwin.current_rig().watch_file()
+        )
+
         self.menubar.add_command(
             label="Concentration/Titration Calculator",
-            command=lambda: ChlorConc(self.core)
+            command=lambda: self.open_calculator()
         )
 
         self.menubar.add_command(
             label="Make new report",
-            command=lambda: Reporter(self.core)
+            command=lambda: self.open_reporter()
         )
 
         self.menubar.add_command(
             label='Pump controller',
-            command=lambda: PumpManager(self.core)
+            command=lambda: self.open_pump_controller()
         )
         self.menubar.add_command(
             label='Settings',
@@ -56,6 +68,24 @@ class MenuBar(tk.Frame):
 
         self.mainwin.winfo_toplevel().config(menu=self.menubar)
 
+    # the windows below are imported when first opened to keep startup quick,
+    # the Reporter in particular pulls in pandas, openpyxl and PIL
+
+    def open_calculator(self):
+        """Open a ChlorConc Toplevel."""
+        from chlor_conc import ChlorConc
+        ChlorConc(self.core)
+
+    def open_reporter(self):
+        """Open a Reporter Toplevel."""
+        from reporter import Reporter
+        Reporter(self.core)
+
+    def open_pump_controller(self):
+        """Open a PumpManager Toplevel."""
+        from pumpops import PumpManager
+        PumpManager(self.core)
+
     def askdir(self):
         """Create a prompt to ask user for a project folder
 
@@ -0,0 +1,108 @@
+"""Per-reading timings for working out why a test missed readings."""
+
+import csv
+import os
+from typing import Optional
+
+# the timings kept for every reading, all in seconds
+FIELDS = ['Slot', 'Scheduled', 'Actual', 'Jitter', 'Pump 1 RTT', 'Pump 2 RTT',
+          'Skew', 'Poll', 'Write', 'Post']
+
+
+def percentile(values: list, pct: float) -> float:
+    """Return the pct percentile of values, interpolating between ranks."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class ReadingMetrics():
+    """Records how long each part of every reading took.
+
+    For each reading it keeps when it was scheduled and when it was taken,
+    each pump's serial round trip, how far apart the two pumps' replies
+    arrived, the whole poll, the time spent writing
+    the output file and the time spent handing the reading to the GUI, so
+    a short dataset can be pinned on the ports, the disk or the GUI.
+    """
+
+    def __init__(self):
+        """Init with no readings."""
+        self.rows = []
+
+    def __len__(self) -> int:
+        """Return the number of readings recorded."""
+        return len(self.rows)
+
+    def record(self, slot: int, scheduled: float, actual: float,
+               rtt1: Optional[float], rtt2: Optional[float],
+               skew: Optional[float], poll: float, write: float,
+               post: float) -> None:
+        """Record one reading's timings, with None for a pump that didn't answer."""
+        self.rows.append(
+            (slot, scheduled, actual, actual - scheduled,
+             rtt1, rtt2, skew, poll, write, post)
+        )
+
+    def column(self, field: str) -> list:
+        """Return every reading's value of field."""
+        index = FIELDS.index(field)
+        return [row[index] for row in self.rows]
+
+    def summary(self) -> list:
+        """Return lines giving the percentiles of each timing, in ms."""
+        if not self.rows:
+            return ["No reading timings were recorded"]
+        lines = []
+        for field in FIELDS[3:]:
+            values = [value for value in self.column(field) if value is not None]
+            if not values:
+                continue
+            p50, p90, p99 = (percentile(values, pct) * 1000 for pct in (50, 90, 99))
+            lines.append(
+                f"{field}: p50 {p50:.1f} ms, p90 {p90:.1f} ms, "
+                f"p99 {p99:.1f} ms, max {max(values) * 1000:.1f} ms"
+            )
+        return lines
+
+    def histogram(self, edges=(1, 5, 10, 50, 100, 500, 1000), width=30) -> list:
+        """Return lines drawing how many readings fell into each jitter bin.
+
+        edges are the upper bounds of the bins in ms, with one more bin for
+        anything later than the last edge.
+        """
+        counts = [0] * (len(edges) + 1)
+        for jitter in self.column('Jitter'):
+            ms = jitter * 1000
+            for index, edge in enumerate(edges):
+                if ms < edge:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+        most = max(max(counts), 1)
+        labels = [f"< {edge} ms" for edge in edges] + [f">= {edges[-1]} ms"]
+        return [
+            f"{label:>10} | {'#' * round(count / most * width)} {count}"
+            for label, count in zip(labels, counts)
+        ]
+
+    def save(self, path: str) -> None:
+        """Write every reading's timings to a csv file at path."""
+        with open(path, "w", newline='') as file:
+            writer = csv.writer(file, delimiter=',')
+            writer.writerow(FIELDS)
+            for row in self.rows:
+                writer.writerow(
+                    ['' if value is None else round(value, 6) for value in row]
+                )
+
+
+def metrics_path(outpath: str) -> str:
+    """Return where the timings for the output file at outpath are saved."""
+    root, _ = os.path.splitext(outpath)
+    return f"{root}.metrics.csv"
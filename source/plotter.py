@@ -0,0 +1,93 @@
+"""Builds the report plot, for the Reporter or without any GUI.
+
+- read_data reads a test's data file
+- style_axes sets up the axes the same way for every report
+- read_project reads a project's series, split_blanks sorts them into blanks and trials
+- draw_project plots them, plot_project does all three
+"""
+
+import os  # handling file paths
+
+from matplotlib.ticker import MultipleLocator
+from pandas import Series, DataFrame
+
+from datacache import CACHE
+from downsample import downsample
+
+
+def color_cycle(colors: str) -> list:
+    """Return the colors in a comma separated 'color cycle' setting."""
+    return [color.strip() for color in colors.split(',')]
+
+
+def read_data(path: str) -> DataFrame:
+    """Return the data in the file at path, or a single zero reading if it's gone."""
+    if os.path.isfile(path):
+        # unchanged files are only parsed once, see DataCache
+        return CACHE.read(path)
+    return DataFrame(data={'Minutes': [0], 'Pump 1': [0], 'Pump 2': [0]})
+
+
+def style_axes(ax, xlim, ylim) -> None:
+    """Label the axes and set their limits and grid."""
+    ax.set_xlabel("Time (min)")
+    ax.set_xlim(left=0, right=xlim)
+    ax.set_ylabel("Pressure (psi)")
+    ax.set_ylim(top=ylim)
+    ax.yaxis.set_major_locator(MultipleLocator(100))
+    ax.grid(color='darkgrey', alpha=0.65, linestyle='-')
+    ax.set_facecolor('w')
+
+
+def read_project(paths, titles, plotpumps, step=None) -> list:
+    """Return a (title, minutes, Series of pressures) for each titled series.
+
+    Series with no title are skipped. If given, step is called with how
+    many series are done after each one.
+    """
+    series = []
+    for i, (path, title, plotpump) in enumerate(zip(paths, titles, plotpumps)):
+        if step is not None and i > 0:
+            step(i)
+        if title == "":
+            continue
+        df = read_data(path)
+        try:
+            df[plotpump]  # make sure the column exists
+        except KeyError:  # backwards compat w/ old data file headers
+            plotpump = plotpump.replace("Pump", "PSI")
+        series.append((title, df['Minutes'], Series(df[plotpump], name=title)))
+    if step is not None:
+        step(len(paths))
+    return series
+
+
+def split_blanks(series) -> tuple:
+    """Return the Series from read_project as (blanks, trials)."""
+    blanks = [data for title, _, data in series if "blank" in str(title).lower()]
+    trials = [data for title, _, data in series if "blank" not in str(title).lower()]
+    return blanks, trials
+
+
+def draw_project(ax, series, method='minmax') -> None:
+    """Plot the series from read_project on ax, with the blanks dashed.
+
+    The Series hold every reading, only the plot is downsampled.
+    """
+    pixels = round(ax.bbox.width)
+    for title, minutes, data in series:
+        if "blank" in str(title).lower():
+            ax.plot(*downsample(minutes, data, pixels, method), label=title, linestyle=('-.'))
+        else:  # plot using default line style
+            ax.plot(*downsample(minutes, data, pixels, method), label=title)
+    ax.legend(loc='best')
+
+
+def plot_project(ax, paths, titles, plotpumps, method='minmax', step=None) -> tuple:
+    """Plot each series on ax and return (blanks, trials) as lists of Series.
+
+    See read_project and draw_project.
+    """
+    series = read_project(paths, titles, plotpumps, step)
+    draw_project(ax, series, method)
+    return split_blanks(series)
@@ -0,0 +1,96 @@
+"""Polls several pumps at once, each from its own reader thread."""
+
+import queue
+import threading
+import time
+
+from serial import SerialException
+
+
+class PumpPoller():
+    """Queries every pump in parallel and collects the replies.
+
+    Each pump gets a daemon thread that sends the query and waits for the
+    reply, so a reading costs the slowest pump's latency rather than the
+    sum of them all.
+    """
+
+    def __init__(self, pumps, timeout: float = 1.0):
+        """Init with a sequence of Pumps."""
+        self.pumps = pumps
+        self.timeout = timeout
+        self.sequence = 0
+        self.responses: queue.Queue = queue.Queue()
+        self.requests: list = []
+        self.threads: list = []
+        for index, pump in enumerate(pumps):
+            requests = queue.Queue()
+            thread = threading.Thread(
+                target=self.read_pump,
+                args=(index, pump, requests),
+                daemon=True
+            )
+            thread.start()
+            self.requests.append(requests)
+            self.threads.append(thread)
+
+    def read_pump(self, index: int, pump, requests: queue.Queue) -> None:
+        """Answer requests for one pump until a None request arrives."""
+        while True:
+            request = requests.get()
+            if request is None:
+                return
+            sequence, func = request
+            try:
+                reply = func(pump)
+                error = None
+            except SerialException as err:
+                reply, error = None, err
+            self.responses.put((sequence, index, reply, error))
+
+    def query(self, func) -> list:
+        """Call func(pump) for every pump at once and return their replies.
+
+        Raises the first SerialException any pump hit, or
+        SerialException if a pump doesn't answer within the timeout.
+        """
+        self.sequence += 1
+        for requests in self.requests:
+            requests.put((self.sequence, func))
+
+        results = [None] * len(self.pumps)
+        errors = []
+        deadline = time.monotonic() + self.timeout
+        pending = len(self.pumps)
+        while pending > 0:
+            try:
+                sequence, index, reply, error = self.responses.get(
+                    timeout=max(deadline - time.monotonic(), 0)
+                )
+            except queue.Empty:
+                raise SerialException(
+                    f"No reply from {pending} pump(s) within {self.timeout} s"
+                )
+            if sequence != self.sequence:
+                continue  # a late reply to a query that already timed out
+            pending -= 1
+            results[index] = reply
+            if error is not None:
+                errors.append(error)
+        if errors:
+            raise errors[0]
+        return results
+
+    def close(self) -> None:
+        """Stop the reader threads, waiting up to the timeout for them to finish.
+
+        A reader still waiting on its pump after that is left to finish on
+        its own, it's a daemon.
+        """
+        for requests in self.requests:
+            requests.put(None)
+        deadline = time.monotonic() + self.timeout
+        for thread in self.threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+            if thread.is_alive():
+                print(f"A pump reader thread didn't stop within {self.timeout} s")
@@ -0,0 +1,124 @@
+"""Finds the serial ports that can be opened, without blocking the GUI."""
+
+import queue
+import threading
+import time
+
+import serial  # talking to the pumps
+import serial.tools.list_ports
+from serial import SerialException
+
+
+class PortScanner():
+    """Probes serial ports in the background and remembers the answers.
+
+    Each port is tried from its own thread and given timeout seconds to
+    open, so one stuck Bluetooth or virtual port can't hold up the rest.
+    Whether a port opened is cached by device and hwid, so a rescan only
+    probes ports that are new or changed since the last one. A port that
+    times out is left off the list until its probe finishes.
+    """
+
+    def __init__(self, timeout: float = 2.0):
+        """Init with the seconds a port gets to open."""
+        self.timeout = timeout
+        self.cache = {}  # (device, hwid) to whether it opened
+        self.stuck = set()  # devices whose probe from an earlier scan is still going
+        self.lock = threading.Lock()
+        self.scanning = False
+        self.rescan = None  # arguments of a scan asked for mid-scan
+
+    def scan(self, callback, held=(), extra=(), force=False) -> None:
+        """Scan on a background thread, then call callback(ports).
+
+        held ports are already open in this app, so count as good without
+        being probed. extra ports are probed as well as the listed ones.
+        force forgets the cache first. callback runs on the scan thread.
+        """
+        with self.lock:
+            if self.scanning:
+                # run once more when this one's done, with the latest args
+                self.rescan = (callback, held, extra, force)
+                return
+            self.scanning = True
+        threading.Thread(
+            target=self.run, args=(callback, held, extra, force),
+            name="port scan", daemon=True
+        ).start()
+
+    def run(self, callback, held, extra, force) -> None:
+        """Do the scans asked for until there are no more."""
+        while True:
+            callback(self.find(held, extra, force))
+            with self.lock:
+                if self.rescan is None:
+                    self.scanning = False
+                    return
+                callback, held, extra, force = self.rescan
+                self.rescan = None
+
+    def find(self, held=(), extra=(), force=False) -> list:
+        """Return the sorted ports that are held or could be opened."""
+        devices = {i.device: i.hwid for i in serial.tools.list_ports.comports()}
+        for port in extra:
+            devices.setdefault(port, '')
+        print(f"Found these devices: {sorted(devices)}")
+        with self.lock:
+            if force:
+                self.cache.clear()
+            # forget ports that went away, so they're probed if they come back
+            for key in list(self.cache):
+                if key[0] not in devices:
+                    del self.cache[key]
+            known = dict(self.cache)
+
+        results = queue.Queue()
+        probing = []
+        for device, hwid in devices.items():
+            if device in held or (device, hwid) in known or device in self.stuck:
+                continue
+            threading.Thread(
+                target=self.probe, args=(device, hwid, results),
+                name=f"probe {device}", daemon=True
+            ).start()
+            probing.append(device)
+
+        found = {}
+        deadline = time.monotonic() + self.timeout
+        for _ in probing:
+            try:
+                device, opened = results.get(
+                    timeout=max(deadline - time.monotonic(), 0)
+                )
+            except queue.Empty:
+                break  # the rest are stuck, try them again next scan
+            found[device] = opened
+        with self.lock:
+            for device in probing:
+                if device in found:
+                    self.cache[(device, devices[device])] = found[device]
+                else:
+                    print(f"{device} took longer than {self.timeout} s to open")
+                    self.stuck.add(device)
+            known = dict(self.cache)
+
+        return sorted(
+            device for device, hwid in devices.items()
+            if device in held or known.get((device, hwid))
+        )
+
+    def probe(self, device: str, hwid: str, results: queue.Queue) -> None:
+        """Try opening device and put (device, whether it opened) in results."""
+        try:
+            serial.Serial(device).close()
+            opened = True
+        except (SerialException, OSError) as error:
+            print(f"Could not connect to port {device}")
+            print(error)
+            opened = False
+        results.put((device, opened))
+        with self.lock:
+            if device in self.stuck:
+                # it got there in the end, so the next scan can use the answer
+                self.stuck.discard(device)
+                self.cache[(device, hwid)] = opened
@@ -0,0 +1,299 @@
+"""Keeps projects and an index of every run's data file in a SQLite database.
+
+- ProjectDB saves and loads Reporter projects, in place of .pct files
+- index_run and index_folder keep the runs table up to date with the files
+- find looks up runs by customer, chemical, blank or trial, and date
+
+Projects are folders like .../customer/company - sample point, holding a
+data file named chemical_concentration.csv for each run.
+"""
+
+from contextlib import closing
+import json
+import os  # handling file paths
+import pickle  # reading legacy project files
+import re
+import sqlite3
+import time
+
+from reportwriter import split_project
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    folder TEXT PRIMARY KEY,
+    customer TEXT,
+    name TEXT,
+    plot_params TEXT,
+    saved REAL
+);
+CREATE TABLE IF NOT EXISTS series (
+    folder TEXT REFERENCES projects(folder) ON DELETE CASCADE,
+    position INTEGER,
+    path TEXT,
+    title TEXT,
+    plotpump TEXT,
+    PRIMARY KEY (folder, position)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    path TEXT PRIMARY KEY,
+    folder TEXT,
+    customer TEXT,
+    project TEXT,
+    chemical TEXT,
+    concentration REAL,
+    rig TEXT,
+    pump TEXT,
+    blank INTEGER,
+    readings INTEGER,
+    duration REAL,
+    max_psi_1 REAL,
+    max_psi_2 REAL,
+    score REAL,
+    modified REAL,
+    size INTEGER,
+    mtime_ns INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_modified ON runs (modified);
+CREATE INDEX IF NOT EXISTS runs_folder ON runs (folder);
+"""
+
+# how find can filter, and the SQL for each
+FILTERS = {
+    'customer': "customer LIKE ?",
+    'project': "project LIKE ?",
+    'chemical': "chemical LIKE ?",
+    'blank': "blank = ?",
+    'since': "modified >= ?",
+    'until': "modified < ?",
+}
+
+
+def parse_name(path: str) -> tuple:
+    """Return the chemical and concentration in a data file's name.
+
+    Experiments name files chemical_concentration.csv, with ' - copy'
+    added when a name is taken. The concentration is None if it isn't
+    a number.
+    """
+    name = os.path.splitext(split_project(path)[-1])[0]
+    while name.endswith(" - copy"):
+        name = name[:-len(" - copy")]
+    chemical, _, rest = name.partition('_')
+    number = re.match(r"\s*(\d+(?:\.\d+)?)", rest)
+    return chemical.strip(), float(number.group(1)) if number else None
+
+
+class ProjectDB():
+    """A SQLite file of saved projects and the runs found in them.
+
+    Every call opens its own connection, so it can be used from any
+    thread or process. Runs are only re-read when their file has changed.
+    """
+
+    def __init__(self, path: str):
+        """Init with the database's path, creating it if it's new."""
+        self.path = path
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        with closing(self.connect()) as db, db:
+            db.execute("PRAGMA journal_mode=WAL")  # readers don't block the writer
+            db.executescript(SCHEMA)
+
+    def connect(self) -> sqlite3.Connection:
+        """Return a new connection to the database."""
+        db = sqlite3.connect(self.path, timeout=10)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA foreign_keys=ON")
+        return db
+
+    def save_project(self, folder: str, plot: dict) -> None:
+        """Save a project's plot dict, as returned by Reporter.prep_plot."""
+        folder = os.path.normpath(folder)
+        parts = split_project(folder)
+        customer = parts[-2] if len(parts) >= 2 else ''
+        with closing(self.connect()) as db, db:
+            db.execute(
+                "INSERT OR REPLACE INTO projects VALUES (?, ?, ?, ?, ?)",
+                (folder, customer, parts[-1], json.dumps(list(plot['plot_params'])),
+                 time.time())
+            )
+            db.execute("DELETE FROM series WHERE folder = ?", (folder,))
+            db.executemany(
+                "INSERT INTO series VALUES (?, ?, ?, ?, ?)",
+                [(folder, i, os.path.normpath(path) if path else path, title, plotpump)
+                 for i, (path, title, plotpump)
+                 in enumerate(zip(plot['paths'], plot['titles'], plot['plotpumps']))]
+            )
+            # the titles say which runs are blanks and which pump was scored
+            db.executemany(
+                "UPDATE runs SET blank = ?, pump = ? WHERE path = ?",
+                [(int("blank" in str(title).lower()), plotpump, os.path.normpath(path))
+                 for path, title, plotpump
+                 in zip(plot['paths'], plot['titles'], plot['plotpumps'])
+                 if path and title != ""]
+            )
+
+    def load_project(self, folder: str):
+        """Return the plot dict saved for folder, or None if there isn't one."""
+        folder = os.path.normpath(folder)
+        with closing(self.connect()) as db:
+            project = db.execute(
+                "SELECT plot_params FROM projects WHERE folder = ?", (folder,)
+            ).fetchone()
+            if project is None:
+                return None
+            series = db.execute(
+                "SELECT path, title, plotpump FROM series WHERE folder = ? ORDER BY position",
+                (folder,)
+            ).fetchall()
+        return {
+            'paths': [row['path'] for row in series],
+            'titles': [row['title'] for row in series],
+            'plotpumps': [row['plotpump'] for row in series],
+            'plot_params': tuple(json.loads(project['plot_params'])),
+        }
+
+    def import_pct(self, pct_path: str, folder: str = None) -> dict:
+        """Save a legacy .pct project file to the database and return its plot dict.
+
+        The project is saved under the folder the .pct file is in, unless
+        another is given.
+        """
+        with open(pct_path, 'rb') as file:
+            plot = pickle.load(file)
+        if folder is None:
+            folder = os.path.dirname(pct_path)
+        self.save_project(folder, plot)
+        print(f"Imported project file\n{pct_path}")
+        return plot
+
+    def index_run(self, path: str, rig: str = None, force: bool = False, df=None) -> bool:
+        """Add or update a data file in the runs table.
+
+        Returns whether the file was read. Files that haven't changed
+        since they were last indexed are skipped unless force is set.
+        df is the file's data from loader.load, if it's already been read.
+        """
+        path = os.path.normpath(path)
+        stat = os.stat(path)
+        with closing(self.connect()) as db:
+            row = db.execute(
+                "SELECT size, mtime_ns FROM runs WHERE path = ?", (path,)
+            ).fetchone()
+        if not force and row is not None and rig is None \
+                and (row['size'], row['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+            return False
+
+        if df is None:
+            # imported here, pandas is slow to load and the GUI starts without it
+            from loader import load
+            df = load(path)
+        folder = os.path.dirname(path)
+        parts = split_project(folder)
+        chemical, concentration = parse_name(path)
+        pumps = [float(df[pump].max()) if pump in df.columns and df[pump].count() else None
+                 for pump in ('Pump 1', 'Pump 2')]
+        duration = float(df['Minutes'].max()) if len(df) else 0.0
+        blank = int("blank" in chemical.lower())
+        pump = None
+        with closing(self.connect()) as db, db:
+            # a saved project's titles know better than the file name
+            series = db.execute(
+                "SELECT title, plotpump FROM series WHERE path = ? AND title != ''",
+                (path,)
+            ).fetchone()
+            if series is not None:
+                blank = int("blank" in series['title'].lower())
+                pump = series['plotpump']
+            # keep what a project or evaluation has said about the run
+            db.execute(
+                """INSERT INTO runs (path, folder, customer, project, chemical,
+                    concentration, rig, pump, blank, readings, duration, max_psi_1,
+                    max_psi_2, modified, size, mtime_ns)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (path) DO UPDATE SET
+                    rig = coalesce(excluded.rig, rig),
+                    readings = excluded.readings, duration = excluded.duration,
+                    max_psi_1 = excluded.max_psi_1, max_psi_2 = excluded.max_psi_2,
+                    modified = excluded.modified, size = excluded.size,
+                    mtime_ns = excluded.mtime_ns""",
+                (path, folder, parts[-2] if len(parts) >= 2 else '', parts[-1],
+                 chemical, concentration, rig, pump, blank, len(df),
+                 round(duration, 3), *pumps, stat.st_mtime, stat.st_size,
+                 stat.st_mtime_ns)
+            )
+        return True
+
+    def index_folder(self, folder: str) -> int:
+        """Index the data files under folder, returning how many were read.
+
+        Runs whose files have gone are dropped from the index.
+        """
+        read = 0
+        found = set()
+        for root, _, files in os.walk(folder):
+            for name in files:
+                if not name.endswith('.csv') or name.endswith('.metrics.csv'):
+                    continue
+                path = os.path.normpath(os.path.join(root, name))
+                found.add(path)  # kept even if it can't be read right now
+                try:
+                    read += self.index_run(path)
+                except (OSError, ValueError) as error:
+                    # not a data file, or one that's being written
+                    print(f"Couldn't index {path}")
+                    print(error)
+        folder = os.path.normpath(folder)
+        inside = os.path.join(folder, '')
+        with closing(self.connect()) as db, db:
+            known = db.execute(
+                "SELECT path FROM runs WHERE folder = ? OR substr(folder, 1, ?) = ?",
+                (folder, len(inside), inside)
+            ).fetchall()
+            db.executemany(
+                "DELETE FROM runs WHERE path = ?",
+                [(row['path'],) for row in known
+                 if row['path'] not in found and not os.path.exists(row['path'])]
+            )
+        return read
+
+    def forget_run(self, path: str) -> None:
+        """Drop a data file that's been deleted from the runs table."""
+        with closing(self.connect()) as db, db:
+            db.execute("DELETE FROM runs WHERE path = ?", (os.path.normpath(path),))
+
+    def record_scores(self, plot: dict, evaluation) -> None:
+        """Save the scores from an Evaluation of a project against its runs."""
+        scores = dict(zip(evaluation.result_titles,
+                          [trial.score for trial in evaluation.trials]))
+        with closing(self.connect()) as db, db:
+            db.executemany(
+                "UPDATE runs SET score = ?, pump = ? WHERE path = ?",
+                [(scores[title], plotpump, os.path.normpath(path)) for path, title, plotpump
+                 in zip(plot['paths'], plot['titles'], plot['plotpumps'])
+                 if path and title in scores]
+            )
+
+    def find(self, limit: int = 1000, **filters) -> list:
+        """Return the runs matching filters, newest first, as sqlite3.Rows.
+
+        customer, project and chemical match part of the name, any case.
+        blank is True or False, and since and until are epoch seconds.
+        """
+        clauses = []
+        values = []
+        for name, value in filters.items():
+            if value is None or value == '':
+                continue
+            clauses.append(FILTERS[name])
+            if name in ('customer', 'project', 'chemical'):
+                value = f"%{value}%"
+            elif name == 'blank':
+                value = int(value)
+            values.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with closing(self.connect()) as db:
+            return db.execute(
+                f"SELECT * FROM runs {where} ORDER BY modified DESC LIMIT ?",
+                (*values, limit)
+            ).fetchall()
@@ -0,0 +1,170 @@
+"""Driver for a pump on a serial port."""
+
+from collections import deque, namedtuple
+import time
+import serial
+from serial import SerialException
+
+# the two letter codes the pumps understand, by friendly name
+CODES = {'run': 'ru', 'stop': 'st', 'info': 'cc', 'pressure': 'pr'}
+
+# a pump's current conditions, with the monotonic times of the exchange
+Conditions = namedtuple('Conditions', ['pressure', 'sent', 'arrived'])
+
+
+class PumpError(SerialException):
+    """A pump didn't give a usable reply within its latency budget."""
+
+
+def parse_pressure(line: bytes) -> int:
+    """Return the pressure field of a reply like b'OK,0123,...'."""
+    start = line.index(b',') + 1
+    stop = line.find(b',', start)
+    if stop == -1:
+        stop = len(line)
+    return int(line[start:stop])
+
+
+def extra_ports(parser) -> list:
+    """Return the 'extra ports' from the settings, eg. emulated pumps."""
+    ports = parser.get('test settings', 'extra ports', fallback='')
+    return [port.strip() for port in ports.split(',') if port.strip()]
+
+
+def pipeline(pumps, code: str, parse=None) -> list:
+    """Send code to every pump before reading any reply.
+
+    Returns (reply, sent, arrived) for each pump, as Pump.command does.
+    The pumps all work on their answers at once, so a round costs about
+    the slowest pump's latency rather than the sum of them. A pump that
+    needs a retry makes it while the others wait.
+    """
+    replies = [pump.request(code, parse) for pump in pumps]
+    return [reply() for reply in replies]
+
+
+class Pump():
+    """Owns a pump's serial port and handles its command protocol.
+
+    Every command gets budget seconds for its reply. An empty, partial or
+    unparseable reply is retried up to retries more times before raising
+    PumpError, so one slow answer costs a retry instead of the test. The
+    round trip of each answered command is kept in round_trips. Commands
+    to several pumps can be sent together, see pipeline.
+    """
+
+    def __init__(self, port: str, budget: float = 0.5, retries: int = 2,
+                 timeout: float = 0.05):
+        """Open the serial port at port."""
+        self.port = port
+        self.budget = budget
+        self.retries = retries
+        self.round_trips: deque = deque(maxlen=1000)  # seconds, most recent last
+        # the timeout values are an alternative to using TextIOWrapper
+        # the values chosen were suggested by the pump's documentation
+        self.serial = serial.Serial(port, timeout=timeout)
+
+    def command(self, code: str, parse=None) -> tuple:
+        """Send a command code and return (reply, sent, arrived).
+
+        If parse is given the reply is parse(line) rather than the line.
+        """
+        return self.request(code, parse)()
+
+    def request(self, code: str, parse=None):
+        """Send a command code now, and return a function that reads the reply.
+
+        Calling it returns what command would, see pipeline.
+        """
+        sent = self.send(code)
+        return lambda: self.receive(code, sent, parse)
+
+    def send(self, code: str) -> float:
+        """Write a command code and return the monotonic time it was sent."""
+        # drop anything a slow pump sent after an earlier attempt gave up
+        self.serial.reset_input_buffer()
+        sent = time.monotonic()
+        self.serial.write(code.encode())
+        return sent
+
+    def receive(self, code: str, sent: float, parse=None) -> tuple:
+        """Read the reply to code, sent at sent, retrying it if need be."""
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                sent = self.send(code)
+            line = self.read_line(sent + self.budget)
+            arrived = time.monotonic()
+            if not line:
+                continue
+            if parse is None:
+                reply = line
+            else:
+                try:
+                    reply = parse(line)
+                except ValueError:
+                    continue
+            self.round_trips.append(arrived - sent)
+            return reply, sent, arrived
+        raise PumpError(
+            f"{self.port} didn't answer '{code}' in {self.retries + 1} tries"
+        )
+
+    def ask(self, code: str, budget: float) -> tuple:
+        """Send a command code once and return (line, sent, arrived).
+
+        Waits only budget seconds for the reply and doesn't retry, so a
+        command from the console can't hold the port across a reading.
+        Its round trip isn't kept with the test's. Raises PumpError if
+        there's no reply in time.
+        """
+        sent = self.send(code)
+        line = self.read_line(sent + budget)
+        arrived = time.monotonic()
+        if not line:
+            raise PumpError(f"{self.port} didn't answer '{code}' within {budget} s")
+        return line, sent, arrived
+
+    def read_line(self, deadline: float) -> bytes:
+        """Read one whole reply without its terminator, or b'' if it's late."""
+        line = b''
+        while True:
+            # returns early with whatever has arrived when the timeout hits
+            line += self.serial.readline()
+            # replies end in a slash, but accept a newline too
+            stripped = line.rstrip()
+            if line.endswith(b'\n') or stripped.endswith(b'/'):
+                return stripped.rstrip(b'/')
+            # checked after reading, as a pipelined reply may be waiting already
+            if time.monotonic() >= deadline:
+                return b''
+
+    def conditions(self) -> Conditions:
+        """Return the pump's current pressure."""
+        return Conditions(*self.command(CODES['info'], parse=parse_pressure))
+
+    def run(self) -> None:
+        """Start the pump."""
+        self.command(CODES['run'])
+
+    def stop(self) -> None:
+        """Stop the pump."""
+        self.command(CODES['stop'])
+
+    def reset_timings(self) -> None:
+        """Forget the round trips so far, eg. from an earlier test."""
+        self.round_trips.clear()
+
+    def close(self) -> None:
+        """Close the serial port."""
+        self.serial.close()
+
+    def timing_summary(self) -> str:
+        """Return a one line description of the round trip times."""
+        if not self.round_trips:
+            return f"{self.port}: no replies"
+        trips = sorted(self.round_trips)
+        mean = sum(trips) / len(trips) * 1000
+        return (
+            f"{self.port} round trip: mean {mean:.1f} ms, "
+            f"max {trips[-1] * 1000:.1f} ms"
+        )
@@ -1,18 +1,17 @@
 """Module for controlling the pumps directly."""
 
-from time import sleep
 import tkinter as tk
 from tkinter import ttk
 from tkinter import font  # type: ignore
 from tkinter.scrolledtext import ScrolledText
-import serial
 import serial.tools.list_ports
-from serial import SerialException
 import webbrowser
 
+from broker import CONSOLE
 from iconer import set_window_icon
+from pump import CODES, extra_ports
 
-COMMANDS = ['run', 'stop', 'info', 'pressure', ' ']
+COMMANDS = ['run', 'stop', 'info', 'pressure']
 
 
 class PumpManager(tk.Toplevel):
@@ -21,6 +20,7 @@ class PumpManager(tk.Toplevel):
     def __init__(self, parent):
         """Init with another Tk as parent."""
         tk.Toplevel.__init__(self, parent)
+        self.core = parent
         self.title("Pump Controller")
         set_window_icon(self)
         self.resizable(0, 0)
@@ -33,7 +33,8 @@ class PumpManager(tk.Toplevel):
 
         container = tk.Frame(self)
         device_lbl = tk.Label(container, text="Device:", anchor='w')
-        devices = sorted([i.device for i in serial.tools.list_ports.comports()])
+        devices = [i.device for i in serial.tools.list_ports.comports()]
+        devices = sorted(devices + extra_ports(self.core.parser))
         self.device_box = ttk.Combobox(
             container,
             values=devices,
@@ -86,29 +87,36 @@ class PumpManager(tk.Toplevel):
         self.device_box.bind('<Button-1>', lambda _: self.update_device_box())
 
     def send_cmd(self, device: str, cmd: str):
-        """Try to open a serial port at device, then send an encoded message."""
-        if cmd == "run":
-            cmd = 'ru'
-        if cmd == "stop":
-            cmd = 'st'
-        if cmd == "info":
-            cmd = 'cc'
-        if cmd == "pressure":
-            cmd = 'pr'
+        """Queue an encoded message for the pump at device on the broker."""
+        cmd = cmd.strip()
+        code = CODES.get(cmd, cmd)  # a name, or the code itself
+        if device == '':
+            self.to_log("Select a device first")
+            return
+        if code not in CODES.values():
+            self.to_log(f"Unknown command '{cmd}', try one of {', '.join(COMMANDS)}")
+            return
+        budget = self.core.parser.getfloat(
+            'test settings', 'console reply budget seconds', fallback=0.25
+        )
+        # waits behind any readings a running test is taking on this pump,
+        # then gets one short try so it's done before the next reading
+        future = self.core.broker.submit(
+            device, lambda pump: pump.ask(code, budget), CONSOLE
+        )
+        future.add_done_callback(
+            lambda done: self.core.ui_queue.post(self.show_reply, done)
+        )
 
+    def show_reply(self, future) -> None:
+        """Log the reply to a command sent by send_cmd."""
         try:
-            cmd = cmd.strip()
-            pump = serial.Serial(device, timeout=0.05)
-            pump.write(f"{cmd}".encode())
-            sleep(0.5)
-            self.to_log(pump.readline().decode())
-            pump.close()
-        except SerialException as error:
-            self.to_log("Cannot access this pump while a test is running.")
-            print(error)
-        except FileNotFoundError as error:
+            reply, sent, arrived = future.result()
+        except Exception as error:  # the broker passes on whatever the request raised
             print(error)
             self.to_log(error)
+            return
+        self.to_log(f"{reply.decode()} ({round((arrived - sent) * 1000)} ms)")
 
     def to_log(self, *msgs) -> None:
         """Log a message to the Text widget in MainWindow's outfrm."""
@@ -121,4 +129,5 @@ class PumpManager(tk.Toplevel):
     def update_device_box(self):
         """Updates the device_box attribute with a current device list."""
         devices = [i.device for i in serial.tools.list_ports.comports()]
+        devices += extra_ports(self.core.parser)
         self.device_box.configure(values=sorted(devices))
@@ -1,22 +1,19 @@
 """Evaluates data and makes a plot."""
 
 import os  # handling file paths
-import pickle  # storing plotter settings
 import tkinter as tk  # GUI
 from tkinter import ttk, filedialog, font  # type: ignore
 from tkinter.messagebox import showinfo, showwarning
-import time
 
 import matplotlib as mpl
-import matplotlib.pyplot as plt  # plotting the data
-from matplotlib.ticker import MultipleLocator
-from pandas import Series, DataFrame, read_csv  # reading the data
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 
 import settings
 from iconer import set_window_icon
 from seriesentry import SeriesEntry
-from evaluator import evaluate
-from exporter import ReportExporter
+from datacache import CACHE
+from plotter import color_cycle
+from reportjob import Cancelled, ReportJob
 
 
 class Reporter(tk.Toplevel):
@@ -31,16 +28,19 @@ class Reporter(tk.Toplevel):
         self.parser = self.core.parser
         self.loc = tk.StringVar()
         self.resizable(0, 0)
+        self.job = None  # the ReportJob plotting and evaluating, see make_plot
+        self.check_id = None
+        CACHE.configure(
+            self.parser.getint('report settings', 'data cache mb', fallback=64) * 1024 ** 2,
+            self.parser.getboolean('report settings', 'data cache sidecars', fallback=False)
+        )
         self.build()
-        # if there's a project file in the dir go ahead and open it
-        project = self.mainwin.project.split('\\')
-        short_proj = project[-1]
-        pickle_project_file = f"{short_proj}.pct"
-        file = os.path.join(self.mainwin.project, pickle_project_file)
-        if os.path.isfile(file):
-            self.unpickle_plot(file)
+        # if the project's been saved go ahead and open it
+        plot = self.read_project(self.mainwin.project)
+        if plot is not None:
+            self.fill_form(plot)
 
-        self.results_queue = {}
+        self.evaluation = None  # the latest Evaluation, see get_results
 
     def build(self) -> None:
         """Make the widgets."""
@@ -51,9 +51,10 @@ class Reporter(tk.Toplevel):
         vcmd = (self.register(self.is_numeric))
 
         self.pltbar = tk.Menu(self)
-        self.pltbar.add_command(label="Save project", command=lambda: self.pickle_plot())
-        self.pltbar.add_command(label="Load project", command=lambda: self.unpickle_plot())
-        self.pltbar.add_command(label='Export report', command=lambda: ReportExporter(self, self.mainwin.project, self.results_queue))
+        self.pltbar.add_command(label="Save project", command=lambda: self.save_project())
+        self.pltbar.add_command(label="Load project", command=lambda: self.load_project())
+        self.pltbar.add_command(label="Find runs", command=lambda: self.find_runs())
+        self.pltbar.add_command(label='Export report', command=lambda: self.export_report())
         self.pltbar.add_command(label='Help', command=lambda: self.show_help())
 
         self.winfo_toplevel().configure(menu=self.pltbar)
@@ -122,6 +123,11 @@ class Reporter(tk.Toplevel):
             command=lambda: self.make_plot(**self.prep_plot())
         )
         self.pltbtn.grid(row=2, columnspan=4, pady=2)
+        # how the evaluation is getting on
+        self.progress = ttk.Progressbar(self.set_frm, length=300, mode='determinate')
+        self.progress.grid(row=3, columnspan=4, pady=2)
+        self.status = tk.Label(master=self.set_frm, text="")
+        self.status.grid(row=4, columnspan=4)
         # grid the settings frame
         self.set_frm.grid(row=1, pady=2)
 
@@ -162,10 +168,17 @@ class Reporter(tk.Toplevel):
         }
         return plot_data
 
-    def make_plot(self, paths, titles, plotpumps, plot_params) -> None:
-        """Make a new plot of the data, then evaluate it."""
+    def make_plot(self, paths, titles, plotpumps, plot_params, then=None) -> None:
+        """Plot and evaluate the data on a worker thread.
+
+        The window stays responsive while it works, and clicking Evaluate
+        again cancels. If given, then is called once the results are in.
+        """
+        if self.job is not None and not self.job.done:
+            self.job.cancel()
+            self.status.configure(text="Cancelling")
+            return
         print("Spawning a new plot \n")
-        start = time.time()
 
         # give names to plot parameters
         style = plot_params[0]
@@ -178,161 +191,204 @@ class Reporter(tk.Toplevel):
             ylim = plot_params[2]
         else:
             ylim = int(self.mainwin.failpsi.get())
+        baseline = plot_params[3]
+
+        # some tests to validate user input, the same way plot_project sorts them
+        named = [str(title) for title in titles if title != ""]
+        blanks = [title for title in named if "blank" in title.lower()]
+        if len(named) == 0:
+            showwarning(
+                parent=self,
+                title="No data selected",
+                message="Click a 'File path:' entry to select a data file"
+            )
+            return
+        elif len(blanks) == 0:
+            showwarning(
+                parent=self,
+                title="No series designated as blank",
+                message="At least one series title must contain 'blank'"
+            )
+            return
+        elif len(blanks) == len(named):
+            showwarning(
+                parent=self,
+                title="No trial data selected",
+                message="Must select least one trial not titled 'blank'")
+            return
+
+        colors = color_cycle(self.parser.get('report settings', 'color cycle'))
+        try:
+            mpl.cycler(color=colors)
+        except ValueError:
+            showwarning(
+                parent=self,
+                title="Invalid Color Cycle",
+                message="Tried to use invalid colors, reverting to defaults"
+            )
+            colors = color_cycle(settings.DEFAULT_DICT['report settings']['color cycle'])
 
-        with plt.style.context(style):
-            colors = self.parser.get('report settings', 'color cycle').split(',')
-            colors = [i.strip() for i in colors]
-            try:
-                mpl.rcParams['axes.prop_cycle'] = mpl.cycler(color=colors)
-            except ValueError:
-                showwarning(
-                    parent=self,
-                    title="Invalid Color Cycle",
-                    message="Tried to use invalid colors, reverting to defaults"
-                )
-                colors = settings.DEFAULT_DICT['report settings']['color cycle']  # type: ignore
-                mpl.rcParams['axes.prop_cycle'] = mpl.cycler(color=colors)
-            fig, ax = plt.subplots(figsize=(12.5, 5), dpi=100)
-            ax.set_xlabel("Time (min)")
-            ax.set_xlim(left=0, right=xlim)
-            ax.set_ylabel("Pressure (psi)")
-            ax.set_ylim(top=ylim)
-            ax.yaxis.set_major_locator(MultipleLocator(100))
-            ax.grid(color='darkgrey', alpha=0.65, linestyle='-')
-            ax.set_facecolor('w')
-            fig.canvas.set_window_title(self.mainwin.winfo_toplevel().title())
-            plt.tight_layout()
-
-            blanks = []
-            trials = []
-            for path, title, plotpump in zip(paths, titles, plotpumps):
-                if os.path.isfile(path):
-                    df = DataFrame(read_csv(path))
-                else:
-                    df = DataFrame(
-                        data={'Minutes': [0], 'Pump 1': [0], 'Pump 2': [0]})
-                try:
-                    df[plotpump]  # make sure the column exists
-                except KeyError:  # backwards compat w/ old data file headers
-                    plotpump = plotpump.replace("Pump", "PSI")
-                # if the trial is a blank run change the line style
-                if title == "":
-                    pass
-                elif "blank" in str(title).lower():
-                    ax.plot(df['Minutes'], df[plotpump], label=title, linestyle=('-.'))
-                    blanks.append(Series(df[plotpump], name=title))
-                else:  # plot using default line style
-                    ax.plot(df['Minutes'], df[plotpump], label=title)
-                    trials.append(Series(df[plotpump], name=title))
-
-            ax.legend(loc='best')
-            baseline = plot_params[3]
-
-            # some tests to validate user input
-            if len(blanks) == 0 and len(trials) == 0:
-                showwarning(
-                    parent=self,
-                    title="No data selected",
-                    message="Click a 'File path:' entry to select a data file"
-                )
-            elif len(blanks) == 0:
-                showwarning(
-                    parent=self,
-                    title="No series designated as blank",
-                    message="At least one series title must contain 'blank'"
-                )
-            elif len(trials) == 0:
-                showwarning(
-                    parent=self,
-                    title="No trial data selected",
-                    message="Must select least one trial not titled 'blank'")
-            else:
-                self.get_results(blanks, trials, baseline, xlim, ylim)
-                fig.show()
-                project = self.mainwin.project.split('\\')
-                short_proj = project[-1]
-                image = f"{short_proj}.png"
-                image_path = os.path.join(self.mainwin.project, image)
-                fig.savefig(image_path)
-                print(f"Saved plot image to\n{image_path}")
-                print(f"Finished plotting in {round(time.time() - start, 2)} s")
-
-    def pickle_plot(self) -> None:
-        """Pickle a list to a file in the project directory."""
-        project = self.mainwin.project.split('\\')
-        short_proj = project[-1]
-        _pickle = f"{short_proj}.pct"
-        _path = os.path.join(self.mainwin.project, _pickle)
-        with open(_path, 'wb') as file:
-            print(f"Pickling project to\n{_path}")
-            pickle.dump(self.prep_plot(), file=file)
+        # the evaluator still gets every point, only the plot is reduced
+        method = self.parser.get('test settings', 'downsample method', fallback='minmax')
+        interval = self.parser.getint('test settings', 'interval seconds')
+        plot = {
+            'paths': paths,
+            'titles': titles,
+            'plotpumps': plotpumps,
+            'plot_params': (style, xlim, ylim, baseline)
+        }
+        self.job = ReportJob(
+            self.mainwin.project, plot, interval, colors, method, self.core.projects
+        )
+        self.progress.configure(maximum=self.job.steps, value=0)
+        self.status.configure(text=self.job.message)
+        self.pltbtn.configure(text="Cancel")
+        self.job.start()
+        self.check_id = self.after(100, self.check_job, self.job, then)
+
+    def check_job(self, job, then=None) -> None:
+        """Show how the job is getting on, and its results once it's done."""
+        self.progress.configure(value=job.progress)
+        self.status.configure(text=job.message)
+        if job.ready_to_draw:
+            job.draw()
+        if not job.done:
+            self.check_id = self.after(100, self.check_job, job, then)
+            return
+        self.check_id = None
+        self.pltbtn.configure(text="Evaluate")
+        if isinstance(job.error, Cancelled):
+            self.progress.configure(value=0)
+            self.status.configure(text="Cancelled")
+        elif job.error is not None:
+            self.status.configure(text="Failed")
+            showwarning(
+                parent=self,
+                title="Couldn't evaluate the project",
+                message=f"{job.error}"
+            )
+        else:
+            self.evaluation = job.evaluation
+            self.show_plot(job.fig)
+            self.show_results()
+            if then is not None:
+                then()
+
+    def show_plot(self, fig) -> None:
+        """Show the finished plot in its own window."""
+        plot_window = tk.Toplevel(self)
+        plot_window.title(self.mainwin.winfo_toplevel().title())
+        set_window_icon(plot_window)
+        canvas = FigureCanvasTkAgg(fig, master=plot_window)
+        NavigationToolbar2Tk(canvas, plot_window)
+        canvas.get_tk_widget().pack(side='top', fill='both', expand=True)
+        canvas.draw()
+
+    def export_report(self) -> None:
+        """Open a ReportExporter for the current results, evaluating first if need be."""
+        if self.job is not None and not self.job.done:
+            return  # the results aren't in yet
+        if self.evaluation is None:
+            self.make_plot(**self.prep_plot(), then=self.export_report)
+            return
+        # imported here, openpyxl and PIL are slow to load
+        from exporter import ReportExporter
+        ReportExporter(self, self.mainwin.project, self.evaluation)
+
+    def save_project(self) -> None:
+        """Save the form to the project database."""
+        print(f"Saving project\n{self.mainwin.project}")
+        self.core.projects.save_project(self.mainwin.project, self.prep_plot())
         showinfo(
             parent=self,
             title="Saved successfully",
-            message=f"Project data saved to\n{_path}"
+            message=f"Project data saved for\n{self.mainwin.project}"
         )
 
-    def unpickle_plot(self, pickle_file=None) -> None:
-        """Unpickle a list of string 3-tuples into SeriesEntry widgets."""
-        if not pickle_file:  # if one isn't passed in
-            file = filedialog.askopenfilename(
+    def load_project(self, folder=None) -> None:
+        """Fill the form from a saved project, asking which if not given."""
+        if not folder:  # if one isn't passed in
+            folder = filedialog.askdirectory(
                 initialdir="C:\"",
-                title="Select data to plot:",
-                filetypes=[("ScaleWiz project files", "*.pct")]
-            )
-        else:
-            file = pickle_file
-        # this puts data paths into their original entries
-        if file != '':
-            print(f"Unpickling project file\n{file}")
-            with open(file, 'rb') as file:
-                plot = pickle.load(file)
-            into_widgets = zip(
-                plot['paths'],
-                plot['titles'],
-                plot['plotpumps'],
-                self.ent_frm.winfo_children()
+                title="Select project to load:"
             )
+        if folder:
+            plot = self.read_project(folder)
+            if plot is None:
+                showwarning(
+                    parent=self,
+                    title="No project found",
+                    message=f"Nothing has been saved for\n{folder}"
+                )
+            else:
+                self.fill_form(plot)
+        # raise the settings window
+        self.lift()
 
-            print("Populating plot parameters")
-            # plot_params are ('bmh', xlim, ylim, baseline)
-            plot_params = (plot['plot_params'][1:])
-            param_widgets = (self.time_limit, self.fail_psi, self.baseline)
-            for widget, parameter in zip(param_widgets, plot_params):
-                widget.delete(0, 'end')
-                widget.insert(0, parameter)
-
-            print("Populating series entry fields")
-            for path, title, plotpump, widget in into_widgets:
-                widget.path.delete(0, 'end')
+    def read_project(self, folder: str):
+        """Return the plot dict saved for folder, or None if there isn't one.
+
+        Projects saved before the database are imported from their .pct file.
+        """
+        plot = self.core.projects.load_project(folder)
+        if plot is None:
+            short_proj = os.path.basename(os.path.normpath(folder))
+            pct = os.path.join(folder, f"{short_proj}.pct")
+            if os.path.isfile(pct):
+                plot = self.core.projects.import_pct(pct, folder)
+        return plot
+
+    def fill_form(self, plot) -> None:
+        """Put a plot dict's paths, titles and parameters into the form."""
+        print("Populating plot parameters")
+        # plot_params are ('bmh', xlim, ylim, baseline)
+        plot_params = (plot['plot_params'][1:])
+        param_widgets = (self.time_limit, self.fail_psi, self.baseline)
+        for widget, parameter in zip(param_widgets, plot_params):
+            widget.delete(0, 'end')
+            widget.insert(0, parameter)
+
+        print("Populating series entry fields")
+        into_widgets = zip(
+            plot['paths'],
+            plot['titles'],
+            plot['plotpumps'],
+            self.ent_frm.winfo_children()
+        )
+        for path, title, plotpump, widget in into_widgets:
+            widget.path.delete(0, 'end')
+            widget.path.insert(0, path)
+            self.after(150, widget.path.xview_moveto, 1)
+            widget.title.delete(0, 'end')
+            widget.title.insert(0, title)
+            self.after(150, widget.title.xview_moveto, 1)
+            widget.plotpump.set(plotpump)
+            #  NOTE: after for race condition
+            #  https://stackoverflow.com/questions/29334544/
+
+    def add_series(self, path: str, title: str, plotpump=None) -> None:
+        """Put a data file into the first empty series entry."""
+        for widget in self.ent_frm.winfo_children():
+            if widget.path.get() == '':
                 widget.path.insert(0, path)
                 self.after(150, widget.path.xview_moveto, 1)
-                widget.title.delete(0, 'end')
                 widget.title.insert(0, title)
-                self.after(150, widget.title.xview_moveto, 1)
-                widget.plotpump.set(plotpump)
-                #  NOTE: after for race condition
-                #  https://stackoverflow.com/questions/29334544/
-
-        # raise the settings window
-        self.lift()
-
-    def get_results(self, blanks, trials, baseline, xlim, ylim):
-        """Evaluate the data."""
-        print("Getting results from evaluator")
-        interval = self.parser.getint('test settings', 'interval seconds')
-        proj = self.mainwin.project
-        self.results_queue, self.log = evaluate(
-            proj, blanks, trials, baseline, xlim, ylim, interval
+                if plotpump:
+                    widget.plotpump.set(plotpump)
+                return
+        showwarning(
+            parent=self,
+            title="No room",
+            message="Remove a series to make room for another"
         )
-        # results_queue is (blank_times, result_titles, result_values, durations, baseline, ylim, max_psis)
 
-        project = self.mainwin.project.split('\\')[-1].strip()
-        log_file = os.path.join(self.mainwin.project, f"{project} log.txt")
-        with open(log_file, 'w') as file:
-            file.write('\n'.join(self.log))
-        print(f"Wrote calculations log to \n{log_file}\n")
+    def find_runs(self) -> None:
+        """Open a RunFinder to search the project database."""
+        from runfinder import RunFinder
+        RunFinder(self, self.core.projects)
 
+    def show_results(self) -> None:
+        """Show the latest Evaluation's scores."""
         result_window = tk.Toplevel(self)
         result_window.attributes('-topmost', 'true')
         result_window.title("Results")
@@ -354,18 +410,26 @@ class Reporter(tk.Toplevel):
             font=bold_font
         ).grid(row=0, column=1, sticky='w', padx=35, pady=3)
 
-        for i, title in enumerate(self.results_queue['result_titles']):
+        for i, title in enumerate(self.evaluation.result_titles):
             entry = tk.Entry(result_window, bg=def_bg, width=len(title))
             entry.insert(0, title)
             entry.configure(state='readonly', relief='flat')
             entry.grid(row=i + 1, column=0, sticky='W', padx=35, pady=3)
 
-        for i, value in enumerate(self.results_queue['result_values']):
+        for i, value in enumerate(self.evaluation.result_values):
             entry = tk.Entry(result_window, bg=def_bg, width=10)
             entry.insert(0, value)
             entry.configure(state='readonly', relief='flat')
             entry.grid(row=i + 1, column=1, sticky='W', padx=35, pady=3)
 
+    def destroy(self) -> None:
+        """Stop any evaluation in progress, then close the window."""
+        if self.check_id is not None:
+            self.after_cancel(self.check_id)
+        if self.job is not None:
+            self.job.cancel()
+        tk.Toplevel.destroy(self)
+
     def is_numeric(self, P):
         """Validate that user input is numeric."""
         if str.isdigit(P) or P == "":
@@ -383,9 +447,11 @@ Clicking on a 'File path' field will prompt you to select the .csv file of the d
 
 Including the word 'blank' in a series title will designate it as such for the purposes of calculations, and will set the data to plot as a dashed line. You must select at least one blank and one non-blank set of data to evaluate results.
 
-Save project: Saves the current Report Generator form to a .pct file
+Save project: Saves the current Report Generator form to the project database
+
+Load project: Repopulates the Report Generator form from a saved project folder. Projects saved as .pct files are imported.
 
-Load project: Repopulates the Report Generator form from a .pct file
+Find runs: Searches every indexed run by customer, chemical, blank or trial and date. Double click a run to add it to the form.
 
 Export report: Makes a copy of the file at 'Template Path' (see Report Settings) and populates it with the results of the evaluation.
 """
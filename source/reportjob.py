@@ -0,0 +1,167 @@
+"""Plots and evaluates a project on a worker thread for the Reporter."""
+
+import os  # handling file paths
+import sqlite3
+import threading
+import time
+
+from matplotlib import cycler, rc_context, style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from evaluator import evaluate
+from reportwriter import split_project
+from plotter import draw_project, read_project, split_blanks, style_axes
+
+
+class Cancelled(Exception):
+    """Raised on the worker thread when the job has been cancelled."""
+
+
+class ReportJob():
+    """Reads a project's data, evaluates it and saves the plot.
+
+    Nothing here touches Tk. The Reporter starts the job, then checks
+    progress, message and done from the Tk thread with after() until it's
+    finished, calling draw when the data's ready. The figure is made on an
+    Agg canvas so the worker can save it, and handed to a Tk canvas once
+    the job is done.
+    """
+
+    def __init__(self, folder: str, plot: dict, interval: int, colors: list,
+                 method: str = 'minmax', projects=None):
+        """Init with a project's folder and the plot dict from prep_plot.
+
+        If given a ProjectDB, the runs and their scores are saved to it.
+        """
+        self.folder = folder
+        self.plot = plot
+        self.interval = interval
+        self.colors = colors
+        self.method = method
+        self.projects = projects
+        self.steps = len(plot['paths']) + 2  # each series, drawing, saving
+        self.progress = 0  # how many steps are done
+        self.message = "Starting"
+        self.series = None  # from read_project, once the data's read
+        self.fig = None
+        self.drawn = threading.Event()
+        self.evaluation = None
+        self.error = None  # the exception that stopped the job, if any
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    @property
+    def done(self) -> bool:
+        """Whether the job has finished, failed or been cancelled."""
+        return self.finished.is_set()
+
+    def start(self) -> None:
+        """Start working on the project."""
+        self.thread.start()
+
+    def cancel(self) -> None:
+        """Stop at the next series, or before drawing or saving."""
+        self.cancelled.set()
+
+    def step(self, message: str) -> None:
+        """Count a step done, or stop here if we've been cancelled."""
+        if self.cancelled.is_set():
+            raise Cancelled()
+        self.progress += 1
+        self.message = message
+
+    def run(self) -> None:
+        """Plot, evaluate and save the project."""
+        start = time.time()
+        try:
+            self.render()
+            print(f"Finished plotting in {round(time.time() - start, 2)} s")
+        except Cancelled:
+            self.error = Cancelled()
+            print("Cancelled the evaluation")
+        except Exception as error:
+            self.error = error
+            print("Couldn't evaluate the project")
+            print(error)
+        finally:
+            self.finished.set()
+
+    def record(self, evaluation) -> None:
+        """Index the project's runs and save their scores."""
+        try:
+            for path in self.plot['paths']:
+                if path and os.path.isfile(path):
+                    self.projects.index_run(path)
+            self.projects.record_scores(self.plot, evaluation)
+        except (OSError, ValueError, sqlite3.Error) as error:
+            print("Couldn't save the results to the project database")
+            print(error)
+
+    @property
+    def ready_to_draw(self) -> bool:
+        """Whether the data's been read and is waiting for draw."""
+        return self.series is not None and not self.drawn.is_set()
+
+    def draw(self) -> None:
+        """Make the figure. Call this from the Tk thread once ready_to_draw.
+
+        Styles change matplotlib's global rcParams while they're applied,
+        so the figure's made on the same thread as the rigs' plots.
+        """
+        plot_style, xlim, ylim = self.plot['plot_params'][:3]
+        try:
+            with style.context(plot_style), rc_context({'axes.prop_cycle': cycler(color=self.colors)}):
+                fig = Figure(figsize=(12.5, 5), dpi=100)
+                FigureCanvasAgg(fig)
+                ax = fig.add_subplot(111)
+                style_axes(ax, xlim, ylim)
+                fig.tight_layout()
+                draw_project(ax, self.series, self.method)
+            self.fig = fig
+        except Exception as error:  # the worker reports it
+            print("Couldn't draw the plot")
+            print(error)
+        finally:
+            self.drawn.set()  # the worker saves the figure, or gives up
+
+    def render(self) -> None:
+        """Do the work, checking for cancellation between steps."""
+        plot_style, xlim, ylim, baseline = self.plot['plot_params'][:4]
+        paths = self.plot['paths']
+        self.message = "Reading data"
+        series = read_project(
+            paths, self.plot['titles'], self.plot['plotpumps'],
+            step=lambda i: self.step(f"Read {i}/{len(paths)} series")
+        )
+        blanks, trials = split_blanks(series)
+        evaluation = evaluate(
+            self.folder, blanks, trials, baseline, xlim, ylim, self.interval
+        )
+        log = evaluation.log()
+        print('\n'.join(log))
+        self.step("Drawing")
+
+        # the Reporter draws the figure on the Tk thread, see draw
+        self.series = series
+        while not self.drawn.wait(0.1):
+            if self.cancelled.is_set():
+                raise Cancelled()
+        if self.fig is None:
+            raise RuntimeError("Couldn't draw the plot")
+        self.step("Saving")
+
+        project = split_project(self.folder)[-1]
+        log_file = os.path.join(self.folder, f"{project.strip()} log.txt")
+        with open(log_file, 'w') as file:
+            file.write('\n'.join(log))
+        print(f"Wrote calculations log to \n{log_file}\n")
+        image_path = os.path.join(self.folder, f"{project}.png")
+        self.fig.savefig(image_path)
+        print(f"Saved plot image to\n{image_path}")
+        self.evaluation = evaluation
+        if self.projects is not None:
+            self.record(evaluation)
+        self.progress = self.steps
+        self.message = "Done"
@@ -0,0 +1,173 @@
+"""Writes a project's xlsx report, free of any tkinter.
+
+- split_project splits a project folder's path on either slash
+- default_details guesses the report header from the project folder
+- write_report fills in a copy of the report template
+"""
+
+from datetime import date
+import os
+import time
+import shutil
+
+
+def split_project(folder: str) -> list:
+    """Return the parts of a project folder's path, split on either slash."""
+    return os.path.normpath(folder).replace('/', '\\').split('\\')
+
+
+def default_details(folder: str) -> list:
+    """Return the report header details that can be guessed from a project folder.
+
+    Folders are expected to look like .../customer/company - sample point.
+    """
+    project = split_project(folder)
+    details = ["#-#", "", "", "", "", "", "200", "", ""]
+    if len(project) >= 3 and ' - ' in project[-1]:
+        details[1] = project[-1].split(' - ')[0].strip()
+        details[2] = project[-1].split(' - ')[1].strip()
+        details[3] = project[-2].strip()
+    return details
+
+
+def write_report(template_path, folder, evaluation, details, trial_clarities):
+    """Fill in a copy of the report template for a project and return its path.
+
+    details are the report header fields in the order of the ReportExporter
+    form, and the plot image must already be saved in folder. Returns None
+    if the image can't be found.
+    """
+    project_name = split_project(folder)[-1]
+    print("Preparing export")
+    start = time.time()
+    analysis_no = details[0]
+    company = details[1]
+    sample = details[2]
+    customer = details[3]
+    client = details[4]
+    sub_date = details[5]
+
+    def ret_num(str) -> int:
+        str = str.replace(",", "")
+        if str == "":
+            str = 0
+        return round(float(str))
+
+    temp = ret_num(details[6])
+    cl = ret_num(details[7])
+    bicarb_adj = ret_num(details[8])
+
+    img_filename = f"{project_name}.png"
+    img_path = os.path.join(folder, img_filename)
+    # check before copying the template, so a failed export leaves nothing behind
+    if not os.path.isfile(img_path):
+        print("Couldn't find the plot image file, aborting export")
+        return None
+
+    file = f"{analysis_no.replace(' ', '')} {project_name} CaCO3 Scale Block Analysis.xlsx"
+    report_path = os.path.join(folder, file)
+
+    print(f"Copying report template to\n{report_path}")
+    shutil.copyfile(template_path, report_path)
+
+    # imported here, they're slow to load and only needed to export
+    import openpyxl
+    import PIL.Image
+
+    print(f"Populating file\n{report_path}")
+    workbook = openpyxl.load_workbook(report_path)
+    ws = workbook.active
+
+    print("Making temp resized plot image")
+    img = PIL.Image.open(img_path)
+    img = img.resize((667, 257))
+    # next to the project's files, so exports running at once don't clash
+    img_path = os.path.join(folder, img_filename[:-4] + "- temp.png")
+    img.save(img_path)
+    img = openpyxl.drawing.image.Image(img_path)
+    img.anchor = 'A28'
+    ws._images[1] = img
+
+    blank_times = evaluation.blank_times
+    result_titles = evaluation.result_titles
+    result_values = evaluation.result_values
+    durations = evaluation.durations
+    baseline = evaluation.baseline
+    ylim = evaluation.ylim
+    max_psis = evaluation.max_psis
+
+    brine_comp = f"Synthetic Field Brine, Chlorides = {cl:,} mg/L"
+    if bicarb_adj != 0:
+        brine_comp += f" (Bicarbs increased to {bicarb_adj:,} mg/L)"
+    ws['D12'] = brine_comp
+
+    ws['D10'] = f"{temp} °F"
+
+    ws['C4'] = customer
+    ws['C5'] = client
+    ws['C6'] = company
+    ws['C7'] = sample
+    today = date.today().strftime("%B %d, %Y")
+    ws['I4'] = analysis_no
+    ws['I6'] = sub_date
+    ws['I7'] = f"{today}"
+    ws['D11'] = f"{baseline} psi"
+    ws['G16'] = round(ylim)
+
+    print(f"customer: {customer}")
+    print(f"company: {company}")
+    print(f"well / sample point: {sample}")
+
+    blank_time_cells = [f"E{i}" for i in range(16, 18)]
+    chem_name_cells = [f"A{i}" for i in range(19, 27)]
+    chem_conc_cells = [f"D{i}" for i in range(19, 27)]
+    duration_cells = [f"E{i}" for i in range(19, 27)]
+    max_psi_cells = [f"G{i}" for i in range(19, 27)]
+    protection_cells = [f"H{i}" for i in range(19, 27)]
+    clarity_cells = [f"J{i}" for i in range(19, 27)]
+
+    chem_names = [" ".join(title.split(' ')[:-2]) for title in result_titles]
+    chem_concs = [" ".join(title.split(' ')[-2:-1]) for title in result_titles]
+
+    for (cell, blank_time) in zip(blank_time_cells, blank_times):
+        ws[cell] = round(blank_time / 60, 2)
+    for (cell, name) in zip(chem_name_cells, chem_names):
+        ws[cell] = f"{name}"
+    for (cell, conc) in zip(chem_conc_cells, chem_concs):
+        ws[cell] = round(float(conc), 1)
+    for (cell, duration) in zip(duration_cells, durations):
+        ws[cell] = round(float(duration), 2)
+    for (cell, psi) in zip(max_psi_cells, max_psis):
+        ws[cell] = round(psi)
+    for (cell, score) in zip(protection_cells, result_values):
+        score = float(score[:-1])
+        if score >= 100:
+            score = 100
+        ws[cell] = score / 100  # the template has conditional % formatting
+    for(cell, clarity) in zip(clarity_cells, trial_clarities):
+        ws[cell] = clarity
+
+    rows_with_data = [16, 17, *range(19, 27)]  # where the data is
+    hide_rows = []  # rows we want to hide
+    resize_rows = []  # rows we want to resize
+
+    for i in rows_with_data:
+        if ws[f'A{i}'].value is None:  # if the cell is empty
+            hide_rows.append(i)  # add it to the list of rows to hide
+        else:
+            resize_rows.append(i)  # add it to the list of rows to reszie
+
+    row_height = 200 / len(resize_rows)  # we have ~200px to work with total
+    if row_height >= 30:  # we don't want any rows bigger than this
+        row_height = 30
+    for row in resize_rows:  # this does the resizing
+        ws.row_dimensions[row].height = row_height
+    for row in hide_rows:  # this hides the empty rows
+        ws.row_dimensions[row].hidden = True
+
+    print(f"Saving report to\n{report_path}")
+    workbook.save(filename=report_path)
+    print("Removing temp files")
+    os.remove(img_path)
+    print(f"Finished export in {round(time.time() - start, 2)} s")
+    return report_path
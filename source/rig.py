@@ -0,0 +1,432 @@
+"""A tab in the main window for running tests on one pair of pumps.
+
+- has the tkinter widgets for one rig's test parameters, controls and plot
+- creates an Experiment when a test is started
+"""
+
+import logging
+import os  # handling file paths
+import tkinter as tk  # GUI
+from tkinter import ttk, filedialog
+from tkinter.scrolledtext import ScrolledText
+from tkinter import font  # type: ignore
+
+from experiment import Experiment
+from logsink import LogSink
+from tailreader import TailReader
+
+
+class Rig(tk.Frame):
+    """Test parameters, controls and live plot for one pump pair."""
+
+    def __init__(self, parent, mainwin, name, *args, **kwargs):
+        """Init with a ttk.Notebook as parent."""
+        tk.Frame.__init__(self, parent, *args, **kwargs)
+        self.mainwin = mainwin
+        self.core = mainwin.core
+        self.parser = self.core.parser
+        self.name = name
+
+        self.ports = []
+        self.port1_val = tk.StringVar()
+        self.port2_val = tk.StringVar()
+        self.port1_val.trace('w', self.check_unique_port1)
+        self.port2_val.trace('w', self.check_unique_port2)
+
+        self.param_widgets = []
+        self.control_widgets = []
+        self.watching = None  # a TailReader for a file to show on the plot
+        self.build_window()
+
+    @property
+    def project(self) -> str:
+        """The project folder output files are written to."""
+        return self.mainwin.project
+
+    @property
+    def running(self) -> bool:
+        """Whether this rig has a test running."""
+        return hasattr(self, 'test') and self.test.running
+
+    def build_window(self) -> None:
+        """Make all the tkinter widgets."""
+        bold_font = font.Font(font=font.nametofont("TkDefaultFont"))
+        bold_font.config(weight='bold')
+
+        # build the main frame
+        self.tst_frm = tk.Frame(self)  # top level container
+        # frame for parameter entries
+        self.ent_frm = tk.LabelFrame(
+            self.tst_frm,
+            text="Test parameters",
+            font=bold_font,
+        )
+        # a frame for test controls
+        self.cmd_frm = tk.LabelFrame(
+            self.tst_frm,
+            text="Test controls",
+            font=bold_font,
+        )
+        # define the self.ent_frm entries
+        self.port1 = ttk.Combobox(
+            self.ent_frm,
+            values=self.ports,
+            textvariable=self.port1_val,
+            width=9,
+            justify='center',
+            state='readonly',
+        )
+        self.port2 = ttk.Combobox(
+            self.ent_frm,
+            values=self.ports,
+            textvariable=self.port2_val,
+            width=9,
+            justify='center',
+            state='readonly',
+        )
+        self.chem = ttk.Entry(
+            self.ent_frm,
+            width=25,
+            justify='center'
+        )
+        self.conc = ttk.Entry(
+            self.ent_frm,
+            width=25,
+            justify='center'
+        )
+        self.strt_btn = ttk.Button(
+            self.ent_frm,
+            text="Start",
+            command=lambda: self.init_test()
+        )
+        # add to convenience list
+        for widget in (self.port1, self.port2, self.chem, self.conc, self.strt_btn):
+            self.param_widgets.append(widget)
+        # make entry labels for self.ent_frm
+        com_lbl = tk.Label(
+            self.ent_frm,
+            text="Device ports:",
+        )
+        chem_lbl = tk.Label(
+            self.ent_frm,
+            text="Chemical:",
+            anchor='e'
+        )
+        conc_lbl = tk.Label(
+            self.ent_frm,
+            text="Concentration:",
+            anchor='e'
+        )
+
+        # grid the labels
+        com_lbl.grid(row=0, sticky=tk.E)
+        chem_lbl.grid(row=3, sticky=tk.E)
+        conc_lbl.grid(row=4, sticky=tk.E)
+
+        # grid entries into self.ent_frm
+        self.port1.grid(row=0, column=1, sticky=tk.E, padx=(0, 4), pady=1)
+        self.port2.grid(row=0, column=2, sticky=tk.W, padx=(4, 0), pady=1)
+        self.chem.grid(row=3, column=1, columnspan=2, pady=1)
+        self.conc.grid(row=4, column=1, columnspan=2, pady=1)
+        self.strt_btn.grid(row=5, column=1, columnspan=2, pady=1)
+        cols = self.ent_frm.grid_size()[0]
+        for col in range(cols):
+            self.ent_frm.grid_columnconfigure(col, weight=1)
+
+        # a frame for the output panel
+        self.out_frm = tk.LabelFrame(
+            self.tst_frm,
+            # this spacing is to avoid using multiple labels
+            text="Elapsed,   Pump 1,   Pump 2",
+            font=bold_font,
+        )
+        self.data_out = ScrolledText(
+            master=self.out_frm,
+            width=45,
+            height=13,
+            state='disabled',
+            wrap='word',
+            bg='white'
+        )
+
+        self.data_out.pack()
+        self.log_sink = LogSink(
+            self.data_out,
+            logging.getLogger(f'scalewiz.{self.name}'),
+            self.core.ui_queue,
+            max_lines=self.parser.getint('test settings', 'log max lines', fallback=1000)
+        )
+        if self.project is os.getcwd():
+            self.to_log(
+                "Click 'Set project folder' to choose the output directory"
+            )
+
+        # build self.cmd_frm 4x3 grid
+        self.run_btn = ttk.Button(
+            master=self.cmd_frm,
+            text="Run",
+            command=lambda: self.test.run_test(),
+            width=15
+        )
+        self.end_btn = ttk.Button(
+            master=self.cmd_frm,
+            text="End",
+            command=lambda: self.end_test(),
+            width=15
+        )
+        self.run_btn.grid(row=1, column=0, padx=5, pady=2, sticky='e')
+        self.end_btn.grid(row=1, column=1, padx=5, pady=2, sticky='w')
+        cols = self.cmd_frm.grid_size()[0]
+        for col in range(cols):
+            self.cmd_frm.grid_columnconfigure(col, weight=1)
+
+        tk.Label(
+            master=self.cmd_frm,
+            text="Select data to plot:"
+        ).grid(row=0, column=0, padx=5, sticky='e')
+        # combobox to choose which set of data to plot
+        self.def_pump = ttk.Combobox(
+            master=self.cmd_frm,
+            values=["Pump 1", "Pump 2"],
+            state='readonly',
+            justify='center',
+            width=13,
+        )
+        self.def_pump.set(self.parser.get('test settings', 'default pump'))
+
+        self.def_pump.grid(row=0, column=1, padx=5, sticky='w')
+
+        for widget in (self.run_btn, self.end_btn, self.def_pump):
+            self.control_widgets.append(widget)
+        # set up the plot area
+        # the same size as the figure, so nothing moves when it turns up
+        self.plt_frm = tk.Frame(master=self.tst_frm, width=750, height=400)
+        self.fig = None
+        # matplotlib is slow to import, so let the window show up first
+        self.after_id = self.after_idle(self.build_plot)
+
+        # grid stuff into self.tst_frm
+        self.ent_frm.grid(row=0, column=0, sticky='new')
+        self.plt_frm.grid(row=0, column=1, rowspan=3, sticky='nsew')
+        self.out_frm.grid(row=1, column=0, sticky='nsew')
+        self.cmd_frm.grid(row=2, column=0, sticky='sew')
+        self.tst_frm.grid(padx=3)
+
+        # widget bindings
+        self.chem.bind("<Return>", lambda _: self.conc.focus_set())
+        self.conc.bind("<Return>", lambda _: self.init_test())
+        # clicking the label probes every port again, not just new ones
+        com_lbl.bind("<Button-1>", lambda _: self.mainwin.update_port_boxes(force=True))
+        for port in (self.port1, self.port2):
+            port.bind("<Button-1>", lambda _: self.mainwin.update_port_boxes())
+            port.bind("<FocusIn>", lambda _: self.tst_frm.focus_set())
+        self.def_pump.bind("<FocusIn>", lambda _: self.tst_frm.focus_set())
+        self.run_btn.bind('<Return>', lambda _: self.test.run_test())
+        self.end_btn.bind('<Return>', lambda _: self.end_test())
+        # move the cursor here for convenience
+        self.chem.focus_set()
+        # disable the controls to prevent starting test w/o parameters
+        for widget in (self.control_widgets):
+            widget.configure(state="disabled")
+
+    def set_ports(self, ports: list) -> None:
+        """Update the device port Comboboxes with a list of port names."""
+        self.ports = ports
+        for port in (self.port1, self.port2):
+            port.configure(values=self.ports)
+
+        # update the list, each can be selected only once
+        if "?" in self.port1.get() or "?" in self.port2.get():
+            print(f"Disabling {self.name} start button")
+            self.strt_btn.configure(state='disabled')
+        elif not self.running:
+            print(f"Enabling {self.name} start button")
+            self.strt_btn.configure(state='normal')
+
+    def check_unique_port1(self, *args):
+        """Make sure each selected port value is unique."""
+        if self.port1_val.get() == self.port2_val.get():
+            self.move_port(self.port2, self.port2_val)
+
+    def check_unique_port2(self, *args):
+        """Make sure each selected port value is unique."""
+        if self.port2_val.get() == self.port1_val.get():
+            self.move_port(self.port1, self.port1_val)
+
+    def move_port(self, box: ttk.Combobox, value: tk.StringVar) -> None:
+        """Move a port Combobox off the port the other one just took."""
+        taken = value.get()
+        others = [port for port in self.ports if port != taken]
+        # left alone if there's nowhere to go, eg. both say ?? with no ports
+        if not others:
+            return
+        index = box.current()  # -1 if it isn't showing one of self.ports
+        if index > -1 and self.ports[index - 1] != taken:
+            value.set(self.ports[index - 1])
+        else:
+            value.set(others[0])
+
+    def init_test(self) -> None:
+        """Scrape form for user input, then init an Experiment object."""
+        if self.running:
+            return
+        port1 = self.port1.get().strip()
+        port2 = self.port2.get().strip()
+        if self.core.rig_manager.in_use(port1, port2):
+            self.to_log(f"{port1} or {port2} is in use by another rig")
+            return
+        if hasattr(self, 'test'):
+            self.test.abandon()  # one that was set up but never run
+        print(f"Initializing a new Experiment on {self.name}")
+        params = {
+            'port1': port1,
+            'port2': port2,
+            'timelimit': self.parser.getint(
+                'test settings',
+                'time limit minutes'
+            ),
+            'failpsi': self.parser.getint('test settings', 'fail psi'),
+            'chem': self.chem.get().strip().replace(' ', '_'),
+            'conc': self.conc.get().strip().replace(' ', '_')
+        }
+        self.test = Experiment(self, **params)
+        self.run_btn.focus_set()
+
+    def end_test(self):
+        """Sets the test.running variable to False if it exists."""
+        if hasattr(self, 'test'):
+            self.test.running = False
+
+    def to_log(self, *msgs) -> None:
+        """Log a message to the Text widget in the rig's out_frm."""
+        self.log_sink.put(*msgs)
+
+    def build_plot(self) -> None:
+        """Make the figure once, with an empty line for animate to update."""
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.ticker import MultipleLocator
+
+        with plt.style.context('bmh'):
+            self.fig, self.axis = plt.subplots(figsize=(7.5, 4), dpi=100)
+            self.fig.patch.set_facecolor('#F0F0F0')
+            self.fig.subplots_adjust(left=0.10, bottom=0.12, right=0.97, top=0.95)
+            self.axis.set_xlabel("Time (min)")
+            self.axis.set_ylabel("Pressure (psi)")
+            self.axis.set_xlim(0, 1)
+            self.axis.set_ylim(0, self.parser.getint('test settings', 'fail psi'))
+            self.axis.yaxis.set_major_locator(MultipleLocator(100))
+            self.axis.grid(color='darkgrey', alpha=0.65, linestyle='-')
+            self.axis.set_facecolor('w')
+            # animated artists are left out of full draws, see blit_line
+            self.line, = self.axis.plot([], [], label=" ", animated=True)
+            self.axis.legend(loc=0)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.plt_frm)
+        self.canvas.get_tk_widget().pack(side="top", fill="both", expand=True)
+        self.background = None  # the axes without the line, for blitting
+        self.plotted = None  # the buffer the line was last drawn from
+        self.canvas.mpl_connect('draw_event', self.cache_background)
+        self.plot_pixels = round(self.axis.bbox.width)
+        self.frame_ms = self.parser.getint('test settings', 'interval seconds') * 1000
+        self.after_id = self.after(self.frame_ms, self.animate)
+
+    def cache_background(self, event) -> None:
+        """Keep a copy of the freshly drawn axes, then draw the line on it."""
+        self.background = self.canvas.copy_from_bbox(self.axis.bbox)
+        self.axis.draw_artist(self.line)
+
+    def watch_file(self) -> None:
+        """Ask for a data file to follow on the plot while no test runs."""
+        path = filedialog.askopenfilename(
+            initialdir=self.project,
+            title="Select data file to watch:",
+            filetypes=[("CSV files", "*.csv")]
+        )
+        if path == "":
+            return
+        reader = TailReader(path)
+        try:
+            reader.poll()
+        except ValueError as error:
+            self.to_log(error)
+            return
+        self.watching = reader
+        self.to_log(f"Watching {path}")
+
+    def plot_source(self):
+        """Return the RingBuffer or TailReader the plot should show."""
+        if self.watching is not None and not self.running:
+            return self.watching
+        if hasattr(self, 'test'):
+            return self.test.buffer
+        return None
+
+    def animate(self) -> None:
+        """Update the live plot with the current test's data."""
+        self.after_id = self.after(self.frame_ms, self.animate)
+        source = self.plot_source()
+        if source is None:  # we didn't start running a test yet
+            data = {'Minutes': [], 'Pump 1': [], 'Pump 2': []}
+        else:
+            if source is self.watching:
+                try:
+                    source.poll()  # only parses what was added
+                except ValueError as error:
+                    self.to_log(error)
+                    self.watching = None
+            data = source.snapshot()
+        x_data = data['Minutes']
+        # imported here, numpy is slow to load and the window starts without it
+        from downsample import downsample
+        # no use drawing more points than the plot is pixels wide
+        self.line.set_data(*downsample(
+            x_data,
+            data[self.def_pump.get()],
+            self.plot_pixels,
+            self.parser.get('test settings', 'downsample method', fallback='minmax')
+        ))
+
+        # anything but the line changing means the whole figure is redrawn
+        redraw = False
+        if source is not self.plotted:  # a new test or file
+            self.plotted = source
+            self.axis.set_xlim(0, 1)
+            redraw = True
+        if len(x_data) > 0 and x_data[-1] > self.axis.get_xlim()[1]:
+            # grow in steps so the axes are only redrawn now and then
+            self.axis.set_xlim(0, x_data[-1] * 1.25)
+            redraw = True
+        fail_psi = self.parser.getint('test settings', 'fail psi')
+        if self.axis.get_ylim()[1] != fail_psi:
+            self.axis.set_ylim(0, fail_psi)
+            redraw = True
+        if source is self.watching:
+            label = os.path.basename(self.watching.path)[:-4]
+        elif self.chem.get() == "" and self.conc.get() == "":
+            label = " "
+        else:
+            label = f"{self.chem.get().strip()} {self.conc.get().strip()}"
+        if label != self.line.get_label():
+            self.line.set_label(label)
+            self.axis.legend(loc=0)
+            redraw = True
+
+        if redraw or self.background is None:
+            self.canvas.draw()
+        else:
+            self.blit_line()
+
+    def blit_line(self) -> None:
+        """Redraw only the line over the cached background."""
+        self.canvas.restore_region(self.background)
+        self.axis.draw_artist(self.line)
+        self.canvas.blit(self.axis.bbox)
+
+    def destroy(self) -> None:
+        """Stop animating and let go of the figure, then destroy the rig."""
+        self.after_cancel(self.after_id)
+        self.log_sink.close()
+        if self.fig is not None:
+            import matplotlib.pyplot as plt
+            plt.close(self.fig)
+        tk.Frame.destroy(self)
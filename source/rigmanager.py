@@ -0,0 +1,82 @@
+"""Runs the test loops of every rig on a shared pool of threads."""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+
+class RigManager():
+    """Shared acquisition engine for all the rigs in one ScaleWiz instance.
+
+    Each running Experiment gets a worker thread of its own, so one rig's
+    slow pump or file write never holds up another rig's readings. The
+    manager also keeps track of which ports running tests hold, so two
+    rigs can't be started on the same pump.
+    """
+
+    def __init__(self, max_rigs: int = 8):
+        """Init a pool with one worker per rig."""
+        self.max_rigs = max_rigs
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_rigs,
+            thread_name_prefix='rig'
+        )
+        self.experiments = []  # the Experiments that are running
+        self.lock = threading.Lock()
+
+    def start(self, experiment) -> bool:
+        """Submit an Experiment's test loop, unless its ports are taken."""
+        with self.lock:
+            if experiment in self.experiments:
+                return False
+            if len(self.experiments) >= self.max_rigs:
+                experiment.to_log(
+                    f"Can't run more than {self.max_rigs} rigs at once"
+                )
+                return False
+            if self.in_use(experiment.port1, experiment.port2):
+                experiment.to_log("These pumps are in use by another rig")
+                return False
+            self.experiments.append(experiment)
+        self.executor.submit(self.run, experiment)
+        return True
+
+    def run(self, experiment) -> None:
+        """Run an Experiment's test loop, then release its ports."""
+        try:
+            experiment.take_reading()
+        except Exception as error:
+            # otherwise the pool would swallow it silently
+            print(f"Test loop for {experiment.outpath} failed")
+            print(error)
+            experiment.to_log("The test stopped because of an error", error)
+            raise
+        finally:
+            self.release(experiment)
+
+    def release(self, experiment) -> None:
+        """Forget about an Experiment that is no longer running."""
+        with self.lock:
+            if experiment in self.experiments:
+                self.experiments.remove(experiment)
+
+    def in_use(self, *ports) -> bool:
+        """Whether any of the ports belong to a running Experiment."""
+        return any(port in self.ports() for port in ports)
+
+    def ports(self) -> set:
+        """Return the set of ports held by running Experiments."""
+        held = set()
+        for experiment in list(self.experiments):
+            held.update((experiment.port1, experiment.port2))
+        return held
+
+    @property
+    def running(self) -> bool:
+        """Whether any rig has a test running."""
+        return len(self.experiments) > 0
+
+    def shutdown(self) -> None:
+        """Stop every running test and let the workers finish."""
+        for experiment in list(self.experiments):
+            experiment.running = False
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,85 @@
+"""A fixed-capacity buffer of recent readings for the live plot."""
+
+from array import array
+from typing import Sequence
+
+
+class RingBuffer():
+    """Array-backed ring buffer of float readings, one column per series.
+
+    The readings live in one flat block of doubles: a header slot counting
+    how many rows were ever written, then capacity slots per column. A
+    single writer appends rows while any number of readers take snapshots,
+    without a lock; a reader retries if a row lands mid-copy. Passing a
+    buffer (eg. shared memory) lets the block live outside this object.
+    """
+
+    HEADER = 1  # slots before the column data
+
+    def __init__(self, capacity: int, columns: Sequence[str], buffer=None):
+        """Init with room for capacity rows of the named columns."""
+        self.capacity = max(int(capacity), 1)
+        self.columns = tuple(columns)
+        size = RingBuffer.nbytes(self.capacity, len(self.columns))
+        if buffer is None:
+            buffer = bytearray(size)
+        self.data = memoryview(buffer)[:size].cast('d')
+
+    @staticmethod
+    def nbytes(capacity: int, columns: int) -> int:
+        """Return the bytes needed to hold capacity rows of columns."""
+        return (RingBuffer.HEADER + capacity * columns) * array('d').itemsize
+
+    @property
+    def written(self) -> int:
+        """The number of rows ever appended."""
+        return int(self.data[0])
+
+    def __len__(self) -> int:
+        """Return the number of rows currently held."""
+        return min(self.written, self.capacity)
+
+    def append(self, *values) -> None:
+        """Add a row with a value for each column, dropping the oldest."""
+        written = self.written
+        slot = written % self.capacity
+        for col, value in enumerate(values):
+            self.data[RingBuffer.HEADER + col * self.capacity + slot] = value
+        # publish the row only once all of it is in place
+        self.data[0] = written + 1
+
+    def column(self, col: int, written: int) -> array:
+        """Copy a column's rows, oldest first, as of written rows."""
+        count = min(written, self.capacity)
+        base = RingBuffer.HEADER + col * self.capacity
+        start = (written - count) % self.capacity
+        stop = start + count
+        values = array('d')
+        if stop <= self.capacity:
+            values.frombytes(self.data[base + start:base + stop].tobytes())
+        else:  # the rows wrap around the end of the block
+            values.frombytes(self.data[base + start:base + self.capacity].tobytes())
+            values.frombytes(self.data[base:base + stop - self.capacity].tobytes())
+        return values
+
+    def detach(self) -> None:
+        """Copy the rows into memory of our own and let go of the buffer."""
+        shared = self.data
+        self.data = memoryview(bytearray(shared)).cast('d')
+        shared.release()
+
+    def release(self) -> None:
+        """Let go of the buffer, eg. so shared memory can be closed."""
+        self.data.release()
+
+    def snapshot(self, retries: int = 3) -> dict:
+        """Return a dict of column name to an array of its rows."""
+        for _ in range(retries):
+            written = self.written
+            data = {
+                name: self.column(col, written)
+                for col, name in enumerate(self.columns)
+            }
+            if self.written == written:
+                break
+        return data
@@ -0,0 +1,155 @@
+"""A Toplevel for searching the runs in the project database."""
+
+import os  # handling file paths
+import threading
+import time
+import tkinter as tk
+from tkinter import ttk, filedialog
+from tkinter.messagebox import showwarning
+
+from iconer import set_window_icon
+
+# Treeview columns, and the width of each
+COLUMNS = {
+    'Date': 80, 'Customer': 120, 'Project': 160, 'Chemical': 100, 'ppm': 50,
+    'Kind': 50, 'Rig': 60, 'Pump': 60, 'Minutes': 60, 'Max psi': 60, 'Score': 60,
+}
+KINDS = {'Any': None, 'Blanks': True, 'Trials': False}
+
+
+def parse_date(text: str, end: bool = False):
+    """Return epoch seconds at the start of a YYYY-MM-DD date, or None if blank.
+
+    With end set, it's the start of the next day, so the date is included.
+    """
+    if text.strip() == '':
+        return None
+    seconds = time.mktime(time.strptime(text.strip(), "%Y-%m-%d"))
+    return seconds + 86400 if end else seconds
+
+
+class RunFinder(tk.Toplevel):
+    """Searches every indexed run, and adds the chosen ones to a Reporter."""
+
+    def __init__(self, parent, projects):
+        """Init with the Reporter to add runs to and its ProjectDB."""
+        tk.Toplevel.__init__(self, parent)
+        self.reporter = parent
+        self.projects = projects
+        self.title("Find runs")
+        set_window_icon(self)
+        self.rows = {}  # Treeview item to the run's row
+        self.build()
+        self.search()
+
+    def build(self) -> None:
+        """Make the widgets."""
+        form = tk.Frame(self)
+        self.entries = {}
+        for column, label in enumerate(("Customer", "Project", "Chemical")):
+            tk.Label(form, text=f"{label}:").grid(row=0, column=column, sticky='w', padx=3)
+            entry = ttk.Entry(form, width=18)
+            entry.grid(row=1, column=column, padx=3)
+            entry.bind('<Return>', lambda _: self.search())
+            self.entries[label.lower()] = entry
+        tk.Label(form, text="Kind:").grid(row=0, column=3, sticky='w', padx=3)
+        self.kind = ttk.Combobox(form, values=list(KINDS), state='readonly', width=8)
+        self.kind.set('Any')
+        self.kind.grid(row=1, column=3, padx=3)
+        for column, label in enumerate(("Since", "Until"), start=4):
+            tk.Label(form, text=f"{label} (YYYY-MM-DD):").grid(row=0, column=column, sticky='w', padx=3)
+            entry = ttk.Entry(form, width=12)
+            entry.grid(row=1, column=column, padx=3)
+            entry.bind('<Return>', lambda _: self.search())
+            self.entries[label.lower()] = entry
+        ttk.Button(form, text="Search", command=self.search).grid(row=1, column=6, padx=3)
+        ttk.Button(form, text="Index folder", command=self.index_folder).grid(row=1, column=7, padx=3)
+        form.grid(row=0, column=0, sticky='w', pady=3)
+
+        tree_frm = tk.Frame(self)
+        self.tree = ttk.Treeview(tree_frm, columns=list(COLUMNS), show='headings', height=20)
+        for name, width in COLUMNS.items():
+            self.tree.heading(name, text=name)
+            self.tree.column(name, width=width, anchor='w')
+        scroll = ttk.Scrollbar(tree_frm, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scroll.set)
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        scroll.grid(row=0, column=1, sticky='ns')
+        tree_frm.grid(row=1, column=0, sticky='nsew', padx=3)
+        self.tree.bind('<Double-1>', self.add_run)
+
+        self.status = tk.Label(self, text="", anchor='w')
+        self.status.grid(row=2, column=0, sticky='w', padx=3)
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+    def search(self) -> None:
+        """Show the runs matching the form."""
+        try:
+            since = parse_date(self.entries['since'].get())
+            until = parse_date(self.entries['until'].get(), end=True)
+        except ValueError:
+            showwarning(parent=self, title="Invalid date", message="Dates look like 2021-03-31")
+            return
+        start = time.time()
+        runs = self.projects.find(
+            customer=self.entries['customer'].get().strip(),
+            project=self.entries['project'].get().strip(),
+            chemical=self.entries['chemical'].get().strip(),
+            blank=KINDS[self.kind.get()],
+            since=since,
+            until=until,
+        )
+        seconds = time.time() - start
+        self.tree.delete(*self.tree.get_children())
+        self.rows.clear()
+        for run in runs:
+            item = self.tree.insert('', 'end', values=(
+                time.strftime("%Y-%m-%d", time.localtime(run['modified'])),
+                run['customer'],
+                run['project'],
+                run['chemical'],
+                '' if run['concentration'] is None else f"{run['concentration']:g}",
+                "Blank" if run['blank'] else "Trial",
+                run['rig'] or '',
+                run['pump'] or '',
+                run['duration'],
+                round(max(psi for psi in (run['max_psi_1'], run['max_psi_2'], 0) if psi is not None)),
+                '' if run['score'] is None else f"{run['score']}%",
+            ))
+            self.rows[item] = run
+        self.status.configure(text=f"Found {len(runs)} runs in {round(seconds * 1000)} ms")
+
+    def add_run(self, event) -> None:
+        """Add the double clicked run to the Reporter's form."""
+        item = self.tree.identify_row(event.y)
+        if item not in self.rows:
+            return
+        run = self.rows[item]
+        # titled the same way as picking the file in a SeriesEntry
+        title = os.path.basename(run['path'])[:-4].replace('_', ' ')
+        self.reporter.add_series(run['path'], title, run['pump'])
+
+    def index_folder(self) -> None:
+        """Ask for a folder, then index every data file in it on a thread."""
+        folder = filedialog.askdirectory(initialdir="C:\"", title="Select folder to index:")
+        if folder == '':
+            return
+        self.status.configure(text=f"Indexing {folder}")
+        result = {}
+        thread = threading.Thread(
+            target=lambda: result.update(read=self.projects.index_folder(folder)),
+            daemon=True
+        )
+        thread.start()
+        self.after(100, self.check_index, thread, result)
+
+    def check_index(self, thread, result) -> None:
+        """Search again once the folder's been indexed."""
+        if not self.winfo_exists():
+            return
+        if thread.is_alive():
+            self.after(100, self.check_index, thread, result)
+            return
+        self.search()
+        self.status.configure(text=f"Read {result.get('read', 0)} new or changed files")
@@ -0,0 +1,68 @@
+"""Deadline-based scheduling for taking readings at a fixed interval."""
+
+import time
+
+
+class ReadingScheduler():
+    """Hands out reading slots on a fixed grid of monotonic deadlines.
+
+    Slot n is due at start + n * interval, so time spent talking to the
+    pumps or writing the output file never pushes later readings back.
+    When a reading overruns one or more slots, those slots are either
+    taken immediately to catch up, or recorded as skipped.
+    """
+
+    def __init__(self, interval: float, catch_up: bool = False):
+        """Init with the number of seconds between readings."""
+        self.interval = interval
+        self.catch_up = catch_up
+        self.start = time.monotonic()
+        self.slot = -1  # index of the most recently handed out slot
+        self.skipped = 0  # slots that were missed and not caught up
+        self.jitter = 0.0  # lateness of the most recent slot in seconds
+        self.jitters = []  # lateness of every slot that was taken
+
+    def begin(self) -> None:
+        """Start the grid of deadlines from now."""
+        self.start = time.monotonic()
+        self.slot = -1
+        self.skipped = 0
+        self.jitter = 0.0
+        self.jitters = []
+
+    def deadline(self, slot: int) -> float:
+        """Return the monotonic time a slot is due."""
+        return self.start + slot * self.interval
+
+    def elapsed(self) -> float:
+        """Return seconds since the scheduler began."""
+        return time.monotonic() - self.start
+
+    def wait(self) -> int:
+        """Sleep until the next slot is due, then return its index."""
+        slot = self.slot + 1
+        now = time.monotonic()
+        late = now - self.deadline(slot)
+        if late >= self.interval and not self.catch_up:
+            # jump to the latest slot that is due and count the rest as lost
+            missed = int(late // self.interval)
+            self.skipped += missed
+            slot += missed
+        elif late < 0:
+            time.sleep(-late)
+
+        self.slot = slot
+        self.jitter = time.monotonic() - self.deadline(slot)
+        self.jitters.append(self.jitter)
+        return slot
+
+    def summary(self) -> str:
+        """Return a one line description of the timing so far."""
+        if not self.jitters:
+            return "No readings were scheduled"
+        mean = sum(self.jitters) / len(self.jitters) * 1000
+        worst = max(self.jitters) * 1000
+        return (
+            f"Reading jitter: mean {mean:.1f} ms, max {worst:.1f} ms, "
+            f"{self.skipped} skipped slot(s)"
+        )
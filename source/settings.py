@@ -7,30 +7,10 @@ from tkinter import ttk, filedialog
 from tkinter import font  # type: ignore
 import webbrowser
 
+# make_config is re-exported for the core
+from defaults import DEFAULT_DICT, make_config  # noqa: F401
 from iconer import set_window_icon
 
-DEFAULT_DICT = {
-    'test settings': {
-        'fail psi': '1500',
-        'default baseline': 75,
-        'time limit minutes': '90',
-        'interval seconds': '3',
-        'default pump': 'Pump 2',
-        'project folder': '',
-    },
-    'report settings': {
-        'template path': '',
-        'color cycle': """orange, blue, red, mediumseagreen, darkgoldenrod, indigo, mediumvioletred, darkcyan, maroon, darkslategrey"""
-    }
-}
-
-
-def make_config(parser: ConfigParser):
-    """Create a default scalewiz.ini in the current working directory."""
-    parser.read_dict(DEFAULT_DICT)  # type: ignore
-    with open('assets/scalewiz.ini', 'w') as configfile:
-        parser.write(configfile)
-
 
 class ConfigManager(tk.Toplevel):
     """Toplevel for managing settings in an .ini file."""
@@ -0,0 +1,90 @@
+"""Measures how long the program takes to start, and what its imports cost.
+
+- StartupTimer times each stage of startup against a budget
+- import_times runs a script under python -X importtime and ranks the imports
+"""
+
+import subprocess
+import sys
+import time
+from typing import Optional
+
+# the entry point imports this first, so it's about when the program started
+IMPORTED = time.perf_counter()
+
+
+class StartupTimer():
+    """Records when each stage of startup finished."""
+
+    def __init__(self, started: Optional[float] = None):
+        """Init with the time.perf_counter() the program started at.
+
+        Defaults to when this module was imported.
+        """
+        self.started = IMPORTED if started is None else started
+        self.stages = []  # (name, perf_counter when it finished)
+
+    def mark(self, stage: str) -> None:
+        """Record that a stage of startup just finished."""
+        self.stages.append((stage, time.perf_counter()))
+
+    def elapsed(self) -> float:
+        """Return seconds from the start to the last stage."""
+        if not self.stages:
+            return 0.0
+        return self.stages[-1][1] - self.started
+
+    def summary(self) -> str:
+        """Return a one line description of where the time went."""
+        parts = []
+        last = self.started
+        for stage, finished in self.stages:
+            parts.append(f"{stage} {finished - last:.2f} s")
+            last = finished
+        return f"Started in {self.elapsed():.2f} s ({', '.join(parts)})"
+
+    def finish(self, budget: float) -> bool:
+        """Mark the window as shown, print the summary and check the budget."""
+        self.mark('first draw')
+        print(self.summary())
+        if self.elapsed() > budget:
+            print(f"That's over the {budget} s startup budget, "
+                  "run core.pyw --import-times to see which imports are slow")
+            return False
+        return True
+
+
+def import_times(script: str, args=(), top: int = 20) -> list:
+    """Run script under -X importtime and return its slowest imports.
+
+    Returns up to top (cumulative ms, self ms, module) tuples, slowest
+    first, counting only top level packages so each cost shows up once.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', script, *args],
+        stderr=subprocess.PIPE, stdout=subprocess.DEVNULL,
+        universal_newlines=True
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or '[us]' in line:
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3:
+            continue
+        name = fields[2].rstrip()
+        if name.startswith(' ' * 2):
+            continue  # imported by another module, counted in its total
+        times.append(
+            (int(fields[1]) / 1000, int(fields[0]) / 1000, name.strip())
+        )
+    times.sort(reverse=True)
+    return times[:top]
+
+
+def print_import_times(script: str, args=(), top: int = 20) -> None:
+    """Print a table of the slowest imports of script."""
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for cumulative, own, name in import_times(script, args, top):
+        print(f"{cumulative:>9.1f} ms {own:>7.1f} ms  {name}")
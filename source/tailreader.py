@@ -0,0 +1,82 @@
+"""Follows a growing data file, parsing only the rows added to it."""
+
+from array import array
+import os
+
+# older data files named the pump columns differently
+ALIASES = {'PSI 1': 'Pump 1', 'PSI 2': 'Pump 2'}
+
+
+class TailReader():
+    """Keeps the parsed columns of a data file and its read offset.
+
+    Each poll reads from where the last one stopped, so the cost follows
+    the rows added rather than the size of the file. A line without its
+    newline yet is held back until the rest of it is written.
+    """
+
+    def __init__(self, path: str, columns: tuple = ('Minutes', 'Pump 1', 'Pump 2')):
+        """Init with the path of the file and the columns to keep."""
+        self.path = path
+        self.columns = tuple(columns)
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything read so far."""
+        self.offset = 0  # bytes of the file already consumed
+        self.partial = b''  # the start of a line that isn't finished yet
+        self.indices = None  # field index of each column, from the header
+        self.data = {name: array('d') for name in self.columns}
+
+    def poll(self) -> int:
+        """Parse rows appended since the last poll and return how many."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return 0
+        if size < self.offset:  # the file was replaced or truncated
+            self.reset()
+        if size == self.offset:
+            return 0
+
+        with open(self.path, 'rb') as file:
+            file.seek(self.offset)
+            chunk = file.read(size - self.offset)
+        self.offset += len(chunk)
+        lines = (self.partial + chunk).split(b'\n')
+        self.partial = lines.pop()
+
+        added = 0
+        for line in lines:
+            fields = line.decode(errors='replace').strip().split(',')
+            if fields == ['']:
+                continue
+            if self.indices is None:
+                self.read_header(fields)
+                continue
+            try:
+                values = [float(fields[i]) for i in self.indices]
+            except (IndexError, ValueError):
+                continue  # skip a malformed row rather than lose the file
+            for name, value in zip(self.columns, values):
+                self.data[name].append(value)
+            added += 1
+        return added
+
+    def read_header(self, fields: list) -> None:
+        """Find where each column is, resolving legacy header names."""
+        names = [ALIASES.get(field.strip(), field.strip()) for field in fields]
+        try:
+            self.indices = [names.index(name) for name in self.columns]
+        except ValueError:
+            raise ValueError(
+                f"{self.path} doesn't have the columns {self.columns}"
+            )
+
+    def __len__(self) -> int:
+        """Return the number of rows parsed so far."""
+        return len(self.data[self.columns[0]])
+
+    def snapshot(self) -> dict:
+        """Return a dict of column name to a copy of its parsed rows."""
+        return {name: array('d', values) for name, values in self.data.items()}
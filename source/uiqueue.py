@@ -0,0 +1,45 @@
+"""Hands work from the acquisition threads to the Tk thread."""
+
+from collections import OrderedDict
+import threading
+
+
+class UIQueue():
+    """Calls posted from any thread, run by the Tk mainloop once per frame.
+
+    Tk widgets may only be touched from the thread running the mainloop,
+    so the test loops post callables here instead. Posting never waits on
+    Tk. Calls posted with the same key before the next frame are coalesced
+    into the latest one, so a burst of readings costs a single update.
+    """
+
+    def __init__(self, root, frame_ms: int = 50):
+        """Init with the Tk root whose mainloop drains the queue."""
+        self.root = root
+        self.frame_ms = frame_ms
+        self.pending = OrderedDict()
+        self.lock = threading.Lock()
+        self.after_id = self.root.after(self.frame_ms, self.drain)
+
+    def post(self, func, *args, key=None) -> None:
+        """Queue func(*args) to be called on the Tk thread."""
+        if key is None:
+            key = object()  # never coalesced
+        with self.lock:
+            # move a coalesced call to the back so order is kept
+            self.pending.pop(key, None)
+            self.pending[key] = (func, args)
+
+    def drain(self) -> None:
+        """Run every queued call, then check again next frame."""
+        with self.lock:
+            calls = list(self.pending.values())
+            self.pending.clear()
+        for func, args in calls:
+            try:
+                func(*args)
+            except Exception as error:
+                # one bad update shouldn't stop the queue from draining
+                print(f"UI update {func.__name__} failed")
+                print(error)
+        self.after_id = self.root.after(self.frame_ms, self.drain)
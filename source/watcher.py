@@ -0,0 +1,150 @@
+"""Notices new and changed data files so they're ready before they're needed."""
+
+import os  # handling file paths
+import sqlite3
+import threading
+
+
+class FolderWatcher():
+    """Polls a folder for data files that have been added or changed.
+
+    Each scan takes the size and modification time of every csv under the
+    folder. A file that's new or changed is ingested once it's gone a scan
+    without changing, so a test that's still writing isn't read over and
+    over. Ingesting reads the file into the data cache along with the rest
+    of its project, and updates its row in the project database. Files
+    already there when watching starts are only indexed.
+    """
+
+    def __init__(self, projects, interval: float = 10, folder: str = '',
+                 cache_bytes: int = 64 * 1024 ** 2, sidecars: bool = False):
+        """Init with the ProjectDB to keep up to date and the data cache settings.
+
+        folder, eg. the lab's projects share, is watched if given. Otherwise
+        only the project folder in use is.
+        """
+        self.projects = projects
+        self.interval = interval
+        self.folder = folder
+        self.cache_bytes = cache_bytes
+        self.sidecars = sidecars
+        self.root = None
+        self.snapshot = None  # path to (size, mtime), None until the first scan
+        self.pending = {}  # paths that changed last scan
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def watch_project(self, project: str) -> None:
+        """Watch project, or the watch folder if set, starting the watcher if need be."""
+        # never guess at a parent folder, it could be the whole user profile
+        folder = self.folder or project
+        if folder == '':
+            return
+        root = os.path.normpath(folder)
+        with self.lock:
+            if root != self.root:
+                print(f"Watching for data files in\n{root}")
+                self.root = root
+                self.snapshot = None
+                self.pending.clear()
+        if self.thread is None and self.interval > 0:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def stop(self) -> None:
+        """Stop watching after the current scan."""
+        self.stopped.set()
+
+    def run(self) -> None:
+        """Scan every interval until stopped."""
+        # waiting first keeps the first scan out of the way of starting up
+        while not self.stopped.wait(self.interval):
+            try:
+                self.scan()
+            except Exception as error:  # keep watching whatever happens
+                print("Couldn't scan for data files")
+                print(error)
+
+    def files(self, root: str) -> dict:
+        """Return the size and modification time of every data file under root."""
+        found = {}
+        for folder, _, names in os.walk(root):
+            for name in names:
+                # the metrics sidecars are csvs too, but aren't data
+                if not name.endswith('.csv') or name.endswith('.metrics.csv'):
+                    continue
+                path = os.path.normpath(os.path.join(folder, name))
+                try:
+                    stat = os.stat(path)
+                except OSError:  # deleted since the walk saw it
+                    continue
+                found[path] = (stat.st_size, stat.st_mtime_ns)
+        return found
+
+    def scan(self) -> None:
+        """Compare the folder to the last scan, and ingest what's settled."""
+        with self.lock:
+            root = self.root
+            snapshot = self.snapshot
+        if root is None or not os.path.isdir(root):
+            return
+        found = self.files(root)
+
+        if snapshot is None:
+            for path in found:
+                self.index(path)
+        else:
+            settled = []
+            for path, signature in found.items():
+                if snapshot.get(path) != signature:
+                    self.pending[path] = signature  # still being written, maybe
+                elif self.pending.pop(path, None) is not None:
+                    settled.append(path)
+            for path in settled:
+                self.ingest(path, found)
+            for path in snapshot.keys() - found.keys():
+                self.pending.pop(path, None)
+                self.forget(path)
+
+        with self.lock:
+            if self.root == root:  # unless we've switched folders meanwhile
+                self.snapshot = found
+
+    def index(self, path: str, df=None) -> None:
+        """Add a file to the project database."""
+        try:
+            self.projects.index_run(path, df=df)
+        except (OSError, ValueError, sqlite3.Error) as error:
+            print(f"Couldn't index {path}")
+            print(error)
+
+    def ingest(self, path: str, found: dict) -> None:
+        """Read a settled file and the rest of its project into the cache, and index it."""
+        # imported here, pandas is slow to load and the GUI starts without it
+        from datacache import CACHE
+        CACHE.configure(self.cache_bytes, self.sidecars)
+        folder = os.path.dirname(path)
+        # the project's other runs, the blanks especially, are evaluated with it
+        for other in found:
+            if other != path and os.path.dirname(other) == folder:
+                try:
+                    CACHE.read(other)
+                except (OSError, ValueError):
+                    continue
+        try:
+            df = CACHE.read(path)
+        except (OSError, ValueError) as error:
+            print(f"Couldn't read {path}")
+            print(error)
+            return
+        self.index(path, df)
+        print(f"Ingested {path}")
+
+    def forget(self, path: str) -> None:
+        """Drop a deleted file from the project database."""
+        try:
+            self.projects.forget_run(path)
+        except sqlite3.Error as error:
+            print(f"Couldn't drop {path} from the index")
+            print(error)